@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Load generator for mattersend.
+#
+# Sends messages at a given concurrency through Message.send() (api mode) or
+# separate CLI processes (cli mode), against the local fake webhook server
+# unless --url points somewhere else, and reports throughput, latency
+# percentiles and failures.
+#
+#   python benchmarks/load.py -n 2000 -c 16 --latency 0.01 --throttle-rate 0.02
+#   python benchmarks/load.py --mode cli -n 100 -c 4 --json
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import mattersend  # noqa: E402
+import webhook_server  # noqa: E402
+
+
+def send_api(url, text):
+    msg = mattersend.Message(channel='load', url=url)
+    msg.text = text
+    try:
+        msg.send()
+    except mattersend.WebhookError as e:
+        return 'HTTP {}'.format(e.status_code)
+    except Exception as e:
+        return type(e).__name__
+
+
+def send_cli(url, text):
+    proc = subprocess.run([sys.executable, os.path.join(ROOT, 'mattersend.py'),
+                           '-U', url, '-c', 'load'], input=text.encode('utf-8'),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        lines = proc.stderr.decode('utf-8', 'replace').strip().splitlines()
+        return lines[-1] if lines else 'exit status {}'.format(proc.returncode)
+
+
+def timed(send, url, text):
+    start = time.perf_counter()
+    error = send(url, text)
+    return time.perf_counter() - start, error
+
+
+def percentile(samples, p):
+    # nearest rank on sorted samples
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, int(round(p / 100.0 * len(samples))) - 1))]
+
+
+def run(send, url, requests, concurrency, text):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(lambda _: timed(send, url, text), range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    failures = {}
+    for _, error in results:
+        if error is not None:
+            failures[error] = failures.get(error, 0) + 1
+
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(requests / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p95': round(percentile(latencies, 95) * 1000, 2),
+            'p99': round(percentile(latencies, 99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2),
+        },
+        'failed': sum(failures.values()),
+        'failures': failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mattersend load generator')
+    parser.add_argument('-n', '--requests', type=int, default=1000,
+                        help='Messages to send (DEFAULT: %(default)s)')
+    parser.add_argument('-c', '--concurrency', type=int, default=8,
+                        help='Messages sent at the same time (DEFAULT: %(default)s)')
+    parser.add_argument('--mode', choices=['api', 'cli'], default='api',
+                        help='Send through Message.send() or the CLI (DEFAULT: %(default)s)')
+    parser.add_argument('--size', type=int, default=200,
+                        help='Characters per message (DEFAULT: %(default)s)')
+    parser.add_argument('-U', '--url',
+                        help='Webhook URL to load instead of the local fake server')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    webhook_server.add_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = webhook_server.start_server(args)
+
+    mattersend.configure_pool(args.concurrency)
+    text = ('load test message ' * (args.size // 18 + 1))[:args.size]
+    send = send_api if args.mode == 'api' else send_cli
+
+    report = run(send, url, args.requests, args.concurrency, text)
+    report['mode'] = args.mode
+    if server is not None:
+        server.shutdown()
+        report['server'] = server.stats.snapshot()
+
+    if args.json:
+        print(json.dumps(report, indent=4))
+        return
+
+    print("{mode}: {requests} messages, concurrency {concurrency}, {elapsed_s} s".format(**report))
+    print("throughput   {:10.1f} req/s".format(report['requests_per_s']))
+    for key in ('p50', 'p95', 'p99', 'max'):
+        print("latency {:4} {:10.2f} ms".format(key, report['latency_ms'][key]))
+    print("failed       {:10}".format(report['failed']))
+    for error, count in sorted(report['failures'].items()):
+        print("  {:30} {:6}".format(error, count))
+    if server is not None:
+        stats = report['server']
+        print("server       {:10} requests, {} bytes".format(stats['requests'], stats['bytes']))
+        for status, count in stats['statuses'].items():
+            print("  HTTP {:25} {:6}".format(status, count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Microbenchmarks of the mattersend rendering hot paths.
+#
+# Every benchmark reports the best time per call over several rounds and the
+# peak memory allocated by a single call (tracemalloc). Results can be saved
+# as JSON and compared against a baseline, failing when a benchmark got
+# slower or hungrier than the configured thresholds.
+#
+#   python benchmarks/micro.py                       # run and compare with micro_baseline.json
+#   python benchmarks/micro.py --save                # record a new baseline
+#   python benchmarks/micro.py -k md_table --sizes 1K,1M,1G
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BASELINE = os.path.join(HERE, 'micro_baseline.json')
+sys.path.insert(0, ROOT)
+
+import mattersend  # noqa: E402
+from startup import median_ms  # noqa: E402
+
+URL = 'https://chat.example.com/hooks/xxx'
+SIZES = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+
+def parse_size(value):
+    value = value.strip().upper()
+    if value[-1:] in SIZES:
+        return int(value[:-1]) * SIZES[value[-1]]
+    return int(value)
+
+
+def csv_text(rows, columns):
+    lines = [','.join('col{}'.format(c) for c in range(columns))]
+    for r in range(rows):
+        lines.append(','.join('value {} {}'.format(r, c) for c in range(columns)))
+    return '\n'.join(lines) + '\n'
+
+
+def make_file(directory, size):
+    # real text up to 1M, the rest is a sparse hole: the head and tail reads
+    # of attach_file still see the whole size
+    path = os.path.join(directory, 'input-{}.log'.format(size))
+    line = 'Oct 17 12:00:00 host app[1234]: request served in 12ms\n'
+    with open(path, 'w') as f:
+        f.write((line * (min(size, SIZES['M']) // len(line) + 1))[:min(size, SIZES['M'])])
+        f.truncate(size)
+    return path
+
+
+def benchmarks(tmpdir, sizes):
+    # name -> callable timed without arguments
+    narrow = [row.split(',') for row in csv_text(1000, 3).splitlines()]
+    wide = [row.split(',') for row in csv_text(100, 50).splitlines()]
+    huge = csv_text(100000, 8)
+    huge_rows = [line.split(',') for line in huge.splitlines()]
+    code = 'def main():\n    return 42\n' * 100
+
+    attachment = mattersend.Attachment('x' * 5000)
+    attachment.set_title('title')
+    attachment.add_field('Size', '5KiB', True)
+
+    message = mattersend.Message(channel='town-square', url=URL, username='bot')
+    message.text = 'Hello world! ' * 100
+    message.attachments.append(attachment)
+
+    url_icon = mattersend.Message(url=URL, icon='https://example.com/icon.png')
+    emoji_icon = mattersend.Message(url=URL, icon=':smile:')
+    emoji_icon.get_icon()
+
+    yield 'md_table narrow', lambda: mattersend.md_table(narrow)
+    yield 'md_table wide', lambda: mattersend.md_table(wide)
+    yield 'md_table huge limited', lambda: mattersend.md_table(iter(huge_rows), mattersend.text_limit)
+    yield 'csv_table huge', lambda: mattersend.csv_table(huge, 'excel', mattersend.text_limit)
+    yield 'md_code', lambda: mattersend.md_code(code, 'python')
+    yield 'detect_syntax extension', lambda: mattersend.detect_syntax('module.py', None)
+    yield 'detect_syntax mime', lambda: mattersend.detect_syntax('script', 'text/x-sh')
+    yield 'Attachment.data', attachment.data
+    yield 'Message.get_payload', message.get_payload
+    yield 'Message.get_icon url', url_icon.get_icon
+    yield 'Message.get_icon emoji', emoji_icon.get_icon
+
+    for size in sizes:
+        path = make_file(tmpdir, size)
+        for truncate in ('head', 'tail'):
+            def attach(path=path, truncate=truncate):
+                msg = mattersend.Message(url=URL)
+                msg.attach_file(path, truncate=truncate)
+            yield 'attach_file {} {}'.format(size_label(size), truncate), attach
+
+
+def size_label(size):
+    for suffix in ('G', 'M', 'K'):
+        if size >= SIZES[suffix] and size % SIZES[suffix] == 0:
+            return '{}{}'.format(size // SIZES[suffix], suffix)
+    return str(size)
+
+
+def measure(func, rounds, min_time):
+    # calls per round grow until a round lasts min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    best = elapsed / number
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'time_us': round(best * 1e6, 3), 'peak_kb': round(peak / 1024.0, 1)}
+
+
+def compare(results, baseline, time_threshold, memory_threshold):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key, threshold in (('time_us', time_threshold), ('peak_kb', memory_threshold)):
+            # sub-kilobyte peaks are noise
+            if key == 'peak_kb' and result[key] < 1:
+                continue
+            if base[key] and result[key] > base[key] * (1 + threshold):
+                regressions.append('{}: {} {} -> {}'.format(name, key, base[key], result[key]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mattersend rendering microbenchmarks')
+    parser.add_argument('-k', '--filter', metavar='REGEX',
+                        help='Only run the benchmarks matching REGEX')
+    parser.add_argument('-r', '--rounds', type=int, default=5,
+                        help='Timed rounds per benchmark (DEFAULT: %(default)s)')
+    parser.add_argument('--min-time', metavar='SECONDS', type=float, default=0.1,
+                        help='Minimum duration of a round (DEFAULT: %(default)s)')
+    parser.add_argument('--sizes', default='1K,1M,64M',
+                        help='Comma separated attach_file input sizes, up to 1G (DEFAULT: %(default)s)')
+    parser.add_argument('-b', '--baseline', default=BASELINE,
+                        help='Baseline file (DEFAULT: %(default)s)')
+    parser.add_argument('--save', action='store_true', help='Write the results to the baseline file')
+    parser.add_argument('-o', '--output', metavar='FILE', help='Write the results to FILE as JSON')
+    parser.add_argument('--time-threshold', metavar='RATIO', type=float, default=0.25,
+                        help='Allowed slowdown over the baseline (DEFAULT: %(default)s)')
+    parser.add_argument('--memory-threshold', metavar='RATIO', type=float, default=0.25,
+                        help='Allowed peak memory growth over the baseline (DEFAULT: %(default)s)')
+    parser.add_argument('--no-import', action='store_true', help='Skip the import time benchmark')
+    args = parser.parse_args()
+
+    pattern = re.compile(args.filter) if args.filter else None
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size]
+
+    results = {}
+    tmpdir = tempfile.mkdtemp(prefix='mattersend-bench-')
+    try:
+        for name, func in benchmarks(tmpdir, sizes):
+            if pattern and not pattern.search(name):
+                continue
+            results[name] = measure(func, args.rounds, args.min_time)
+            print("{:32} {:12.2f} us {:10.1f} KiB".format(name, results[name]['time_us'],
+                                                           results[name]['peak_kb']))
+    finally:
+        shutil.rmtree(tmpdir)
+
+    if not args.no_import and (pattern is None or pattern.search('import')):
+        import_us = (median_ms(['-c', 'import mattersend'], 20) - median_ms(['-c', 'pass'], 20)) * 1000
+        results['import'] = {'time_us': round(import_us, 1), 'peak_kb': 0}
+        print("{:32} {:12.2f} us".format('import', import_us))
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    for path in filter(None, [args.output, args.baseline if args.save else None]):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=4, sort_keys=True)
+
+    if args.save or not os.path.exists(args.baseline):
+        return
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold)
+    if regressions:
+        sys.exit("regressions over the baseline:\n  " + '\n  '.join(regressions))
+    print("\nno regressions over {}".format(args.baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Startup benchmark for the mattersend CLI.
+#
+# Measures the cold wall time of `mattersend --dry-run` on top of a bare
+# interpreter and the `-X importtime` breakdown of the modules it pulls in,
+# then checks both against the budget tracked in startup_budget.json.
+# Only the import time fails the run by default: the wall time is too noisy
+# on shared machines and is just reported unless --check-wall-time is given.
+# -X importtime needs Python 3.7, older interpreters skip the import check.
+#
+#   python benchmarks/startup.py            # report and check the budget
+#   python benchmarks/startup.py --json     # machine readable report
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BUDGET = os.path.join(HERE, 'startup_budget.json')
+
+DRY_RUN = [os.path.join(ROOT, 'mattersend.py'), '--dry-run',
+           '-U', 'https://chat.example.com/hooks/xxx', '-c', 'benchmark']
+
+
+def run(args, stdin=b''):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable] + args, input=stdin, cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.exit(proc.stderr.decode('utf-8', 'replace'))
+    return elapsed, proc.stderr.decode('utf-8', 'replace')
+
+
+def median_ms(args, runs, stdin=b''):
+    samples = sorted(run(args, stdin)[0] for _ in range(runs))
+    return samples[len(samples) // 2] * 1000
+
+
+def importtime(args, stdin=b''):
+    # None when the interpreter has no -X importtime
+    if sys.version_info < (3, 7):
+        return None
+
+    _, stderr = run(['-X', 'importtime'] + args, stdin)
+
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        selftime, cumulative, module = line[len('import time:'):].split('|')
+        modules[module.strip()] = int(selftime) / 1000.0
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mattersend startup benchmark')
+    parser.add_argument('-r', '--runs', type=int, default=20,
+                        help='Number of cold runs per measurement (DEFAULT: %(default)s)')
+    parser.add_argument('-b', '--budget', default=BUDGET,
+                        help='Budget file (DEFAULT: %(default)s)')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Show the N most expensive imports (DEFAULT: %(default)s)')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--check-wall-time', action='store_true',
+                        help='Also fail when the dry-run wall time is over budget')
+    args = parser.parse_args()
+
+    with open(args.budget, 'r') as f:
+        budget = json.load(f)
+
+    interpreter_ms = median_ms(['-c', 'pass'], args.runs)
+    dry_run_ms = median_ms(DRY_RUN, args.runs, b'benchmark') - interpreter_ms
+
+    # modules imported by the CLI on top of the bare interpreter
+    baseline = importtime(['-c', 'pass'])
+    modules = importtime(DRY_RUN, b'benchmark')
+    if modules is None:
+        sys.stderr.write("import budget not checked: -X importtime needs Python 3.7+, running {}\n".format(
+            '.'.join(map(str, sys.version_info[:3]))))
+        imports = None
+    else:
+        imports = {m: t for m, t in modules.items() if m not in baseline}
+
+    report = {
+        'interpreter_ms': round(interpreter_ms, 2),
+        'dry_run_ms': round(dry_run_ms, 2),
+        'import_ms': round(sum(imports.values()), 2) if imports is not None else None,
+        'imports': sorted(imports, key=imports.get, reverse=True) if imports is not None else [],
+    }
+    over = [k for k in ('dry_run_ms', 'import_ms') if report[k] is not None and report[k] > budget[k]]
+    checked = ['import_ms'] + (['dry_run_ms'] if args.check_wall_time else [])
+
+    if args.json:
+        report['budget'] = budget
+        report['over_budget'] = over
+        print(json.dumps(report, indent=4))
+    else:
+        print("interpreter startup      {:8.2f} ms".format(interpreter_ms))
+        for key, label in (('dry_run_ms', 'dry-run (over interp.)'), ('import_ms', 'imports (self time)')):
+            if report[key] is None:
+                print("{:24} {:>8}     (budget {} ms)".format(label, 'n/a', budget[key]))
+                continue
+            print("{:24} {:8.2f} ms  (budget {} ms)".format(label, report[key], budget[key]))
+        if report['imports']:
+            print("\nmost expensive imports:")
+        for module in report['imports'][:args.top]:
+            print("  {:30} {:8.2f} ms".format(module, imports[module]))
+
+    failed = [k for k in over if k in checked]
+    for key in over:
+        if key not in failed:
+            sys.stderr.write("{} over budget, not checked\n".format(key))
+    if failed:
+        sys.exit("over startup budget: {}".format(', '.join(failed)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+
+# Local stand-in for a mattermost incoming webhook.
+#
+# Accepts the JSON and form encoded payloads mattersend posts, answers after
+# a configurable latency and injects server errors, 429 responses and 413
+# for oversized payloads, so throughput can be measured offline.
+#
+#   python benchmarks/webhook_server.py --port 8065 --latency 0.02 --throttle-rate 0.05
+#   mattersend -U http://127.0.0.1:8065/hooks/test -c town-square <<< hello
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import socketserver
+
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+# http.server only has it from Python 3.7
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.bytes = 0
+
+    def count(self, status, size):
+        with self.lock:
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.bytes += size
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': sum(self.counts.values()),
+                'bytes': self.bytes,
+                'statuses': {str(k): v for k, v in sorted(self.counts.items())},
+            }
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, avoid the delayed ACK stall
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        options = self.server.options
+        size = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(size)
+
+        if options.latency:
+            time.sleep(max(0.0, random.gauss(options.latency, options.jitter)))
+
+        headers = {}
+        if options.max_payload and size > options.max_payload:
+            status, text = 413, 'payload too large'
+        elif random.random() < options.throttle_rate:
+            status, text = 429, 'too many requests'
+            headers['Retry-After'] = str(options.retry_after)
+        elif random.random() < options.error_rate:
+            status, text = options.error_status, 'injected error'
+        else:
+            status, text = self.check_payload(body)
+
+        self.server.stats.count(status, size)
+        self.reply(status, text, headers)
+
+    def check_payload(self, body):
+        try:
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                data = json.loads(body.decode('utf-8'))
+            else:
+                data = json.loads(parse_qs(body.decode('utf-8'))['payload'][0])
+        except (ValueError, KeyError):
+            return 400, 'invalid payload'
+
+        if not data.get('text') and not data.get('attachments'):
+            return 400, 'empty message'
+        return 200, 'ok'
+
+    def reply(self, status, text, headers):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.options.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group('webhook server')
+    group.add_argument('--latency', metavar='SECONDS', type=float, default=0.0,
+                       help='Mean response latency (DEFAULT: %(default)s)')
+    group.add_argument('--jitter', metavar='SECONDS', type=float, default=0.0,
+                       help='Standard deviation of the latency (DEFAULT: %(default)s)')
+    group.add_argument('--error-rate', metavar='RATIO', type=float, default=0.0,
+                       help='Fraction of requests failing with --error-status (DEFAULT: %(default)s)')
+    group.add_argument('--error-status', metavar='CODE', type=int, default=500,
+                       help='Status of the injected errors (DEFAULT: %(default)s)')
+    group.add_argument('--throttle-rate', metavar='RATIO', type=float, default=0.0,
+                       help='Fraction of requests answered with 429 (DEFAULT: %(default)s)')
+    group.add_argument('--retry-after', metavar='SECONDS', type=float, default=0.0,
+                       help='Retry-After of the 429 responses (DEFAULT: %(default)s)')
+    group.add_argument('--max-payload', metavar='BYTES', type=int, default=0,
+                       help='Answer 413 to larger payloads, 0 for no limit (DEFAULT: %(default)s)')
+    group.add_argument('-v', '--verbose', action='store_true', help='Log every request')
+
+
+def start_server(options, host='127.0.0.1', port=0):
+    # serves from a daemon thread, returns the server and the webhook url
+    server = ThreadingHTTPServer((host, port), WebhookHandler)
+    server.options = options
+    server.stats = Stats()
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, 'http://{}:{}/hooks/benchmark'.format(*server.server_address[:2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake mattermost incoming webhook')
+    parser.add_argument('--host', default='127.0.0.1', help='Listen address (DEFAULT: %(default)s)')
+    parser.add_argument('-p', '--port', type=int, default=8065, help='Listen port (DEFAULT: %(default)s)')
+    add_arguments(parser)
+    options = parser.parse_args()
+
+    server, url = start_server(options, options.host, options.port)
+    sys.stderr.write("listening on {}\n".format(url))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(json.dumps(server.stats.snapshot(), indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,23 +3,77 @@
 
 import sys
 import os
-import argparse
-import json
-import csv
-import mimetypes
+import time
+import threading
 
 from io import StringIO
-
-try:
-    import configparser
-except ImportError:
-    import ConfigParser as configparser
+from collections import OrderedDict
 
 name = 'mattersend'
 version = '2.0'
 url = 'https://github.com/mtorromeo/mattersend'
 description = "Library and CLI utility to send messages to mattermost's incoming webhooks"
 
+# per-phase instrumentation: callables receiving (phase, seconds, nbytes)
+timing_hooks = []
+
+# keep-alive connections shared by every Message.send() call. The transport
+# is a key of transports: 'stdlib' (http.client) or 'requests'
+transport = 'stdlib'
+http_timeout = 30.0
+pool_size = 10
+_session = None
+_session_lock = threading.Lock()
+_async_sessions = None
+
+# compact utf-8 JSON bodies posted to the webhooks, orjson is used when
+# installed unless json_backend is 'json'
+json_backend = 'auto'
+json_headers = {'Content-Type': 'application/json'}
+_json_encoder = None
+
+# rate limiting and retries of throttled or unavailable webhooks
+max_retries = 3
+retry_statuses = (429, 502, 503, 504)
+backoff_base = 0.5
+backoff_max = 30.0
+rate_limit_margin = 0.9
+_rate_limiters = {}
+
+# state shared by the processes deduplicating messages
+dedup_state = '~/.mattersend.dedup'
+
+# sequence number of the entries spooled by this process
+_spool_sequence = 0
+
+# parsed configuration files: paths -> (stat signature, section -> options)
+_config_cache = {}
+
+# 4000+ chars triggers error on mattermost, not sure where the limit is
+text_limit = 3500
+
+# bytes read from files and stdin: enough for text_limit characters of utf-8
+read_limit = text_limit * 4
+
+# markdown table cells: one translate() pass escapes pipes and newlines
+md_table_escape = {ord('|'): '❘', ord('\n'): ' ', ord('\r'): ' '}
+md_table_max_width = 40
+
+# csv dialect detection: sampled characters and results cached by source
+# in LRU order
+sniff_sample = 16384
+dialect_cache_size = 256
+_dialect_cache = OrderedDict()
+# guards the LRU caches, files are rendered from several threads
+_cache_lock = threading.Lock()
+
+# resident relay used by the CLI to skip startup costs
+relay_socket_env = 'MATTERSEND_SOCKET'
+relay_socket_default = '~/.mattersend.sock'
+
+# concurrent POSTs when the same message goes to several channels
+fanout_workers = 8
+
 syntaxes = ['diff', 'apache', 'makefile', 'http', 'json', 'markdown',
             'javascript', 'css', 'nginx', 'objectivec', 'python', 'xml',
             'perl', 'bash', 'php', 'coffeescript', 'cs', 'cpp', 'sql', 'go',
@@ -49,12 +103,15 @@ ext_to_syntax = {
     '.mk': 'makefile',
     '.htaccess': 'apache',
     '.json': 'json',
+    '.diff': 'diff',
+    '.patch': 'diff',
     '.js': 'javascript',
     '.css': 'css',
     '.m': 'objectivec',
     '.py': 'python',
     '.xml': 'xml',
     '.pl': 'perl',
+    '.pm': 'perl',
     '.sh': 'bash',
     '.php': 'php',
     '.phtml': 'php',
@@ -69,8 +126,11 @@ ext_to_syntax = {
     '.cc': 'cpp',
     '.cxx': 'cpp',
     '.cpp': 'cpp',
+    '.c++': 'cpp',
     '.h': 'cpp',
     '.hh': 'cpp',
+    '.hpp': 'cpp',
+    '.hxx': 'cpp',
     '.dic': 'cpp',
     '.sql': 'sql',
     '.go': 'go',
@@ -78,924 +138,194 @@ ext_to_syntax = {
     '.java': 'java',
     '.ini': 'ini',
     '.latex': 'latex',
+    'GNUmakefile': 'makefile',
+    'makefile': 'makefile',
 }
 
-emoji_to_code = {
-    'smile': '1f604',
-    'smiley': '1f603',
-    'grinning': '1f600',
-    'blush': '1f60a',
-    'relaxed': '263a',
-    'wink': '1f609',
-    'heart_eyes': '1f60d',
-    'kissing_heart': '1f618',
-    'kissing_closed_eyes': '1f61a',
-    'kissing': '1f617',
-    'kissing_smiling_eyes': '1f619',
-    'stuck_out_tongue_winking_eye': '1f61c',
-    'stuck_out_tongue_closed_eyes': '1f61d',
-    'stuck_out_tongue': '1f61b',
-    'flushed': '1f633',
-    'grin': '1f601',
-    'pensive': '1f614',
-    'relieved': '1f60c',
-    'unamused': '1f612',
-    'disappointed': '1f61e',
-    'persevere': '1f623',
-    'cry': '1f622',
-    'joy': '1f602',
-    'sob': '1f62d',
-    'sleepy': '1f62a',
-    'disappointed_relieved': '1f625',
-    'cold_sweat': '1f630',
-    'sweat_smile': '1f605',
-    'sweat': '1f613',
-    'weary': '1f629',
-    'tired_face': '1f62b',
-    'fearful': '1f628',
-    'scream': '1f631',
-    'angry': '1f620',
-    'rage': '1f621',
-    'pout': '1f621',
-    'triumph': '1f624',
-    'confounded': '1f616',
-    'laughing': '1f606',
-    'satisfied': '1f606',
-    'yum': '1f60b',
-    'mask': '1f637',
-    'sunglasses': '1f60e',
-    'sleeping': '1f634',
-    'dizzy_face': '1f635',
-    'astonished': '1f632',
-    'worried': '1f61f',
-    'frowning': '1f626',
-    'anguished': '1f627',
-    'smiling_imp': '1f608',
-    'imp': '1f47f',
-    'open_mouth': '1f62e',
-    'grimacing': '1f62c',
-    'neutral_face': '1f610',
-    'confused': '1f615',
-    'hushed': '1f62f',
-    'no_mouth': '1f636',
-    'innocent': '1f607',
-    'smirk': '1f60f',
-    'expressionless': '1f611',
-    'man_with_gua_pi_mao': '1f472',
-    'man_with_turban': '1f473',
-    'cop': '1f46e',
-    'construction_worker': '1f477',
-    'guardsman': '1f482',
-    'baby': '1f476',
-    'boy': '1f466',
-    'girl': '1f467',
-    'man': '1f468',
-    'woman': '1f469',
-    'older_man': '1f474',
-    'older_woman': '1f475',
-    'person_with_blond_hair': '1f471',
-    'angel': '1f47c',
-    'princess': '1f478',
-    'smiley_cat': '1f63a',
-    'smile_cat': '1f638',
-    'heart_eyes_cat': '1f63b',
-    'kissing_cat': '1f63d',
-    'smirk_cat': '1f63c',
-    'scream_cat': '1f640',
-    'crying_cat_face': '1f63f',
-    'joy_cat': '1f639',
-    'pouting_cat': '1f63e',
-    'japanese_ogre': '1f479',
-    'japanese_goblin': '1f47a',
-    'see_no_evil': '1f648',
-    'hear_no_evil': '1f649',
-    'speak_no_evil': '1f64a',
-    'skull': '1f480',
-    'alien': '1f47d',
-    'hankey': '1f4a9',
-    'poop': '1f4a9',
-    'shit': '1f4a9',
-    'fire': '1f525',
-    'sparkles': '2728',
-    'star2': '1f31f',
-    'dizzy': '1f4ab',
-    'boom': '1f4a5',
-    'collision': '1f4a5',
-    'anger': '1f4a2',
-    'sweat_drops': '1f4a6',
-    'droplet': '1f4a7',
-    'zzz': '1f4a4',
-    'dash': '1f4a8',
-    'ear': '1f442',
-    'eyes': '1f440',
-    'nose': '1f443',
-    'tongue': '1f445',
-    'lips': '1f444',
-    '+1': '1f44d',
-    'thumbsup': '1f44d',
-    '-1': '1f44e',
-    'thumbsdown': '1f44e',
-    'ok_hand': '1f44c',
-    'facepunch': '1f44a',
-    'punch': '1f44a',
-    'fist': '270a',
-    'v': '270c',
-    'wave': '1f44b',
-    'hand': '270b',
-    'raised_hand': '270b',
-    'open_hands': '1f450',
-    'point_up_2': '1f446',
-    'point_down': '1f447',
-    'point_right': '1f449',
-    'point_left': '1f448',
-    'raised_hands': '1f64c',
-    'pray': '1f64f',
-    'point_up': '261d',
-    'clap': '1f44f',
-    'muscle': '1f4aa',
-    'walking': '1f6b6',
-    'runner': '1f3c3',
-    'running': '1f3c3',
-    'dancer': '1f483',
-    'couple': '1f46b',
-    'family': '1f46a',
-    'two_men_holding_hands': '1f46c',
-    'two_women_holding_hands': '1f46d',
-    'couplekiss': '1f48f',
-    'couple_with_heart': '1f491',
-    'dancers': '1f46f',
-    'ok_woman': '1f646',
-    'no_good': '1f645',
-    'ng_woman': '1f645',
-    'information_desk_person': '1f481',
-    'raising_hand': '1f64b',
-    'massage': '1f486',
-    'haircut': '1f487',
-    'nail_care': '1f485',
-    'bride_with_veil': '1f470',
-    'person_with_pouting_face': '1f64e',
-    'person_frowning': '1f64d',
-    'bow': '1f647',
-    'tophat': '1f3a9',
-    'crown': '1f451',
-    'womans_hat': '1f452',
-    'athletic_shoe': '1f45f',
-    'mans_shoe': '1f45e',
-    'shoe': '1f45e',
-    'sandal': '1f461',
-    'high_heel': '1f460',
-    'boot': '1f462',
-    'shirt': '1f455',
-    'tshirt': '1f455',
-    'necktie': '1f454',
-    'womans_clothes': '1f45a',
-    'dress': '1f457',
-    'running_shirt_with_sash': '1f3bd',
-    'jeans': '1f456',
-    'kimono': '1f458',
-    'bikini': '1f459',
-    'briefcase': '1f4bc',
-    'handbag': '1f45c',
-    'pouch': '1f45d',
-    'purse': '1f45b',
-    'eyeglasses': '1f453',
-    'ribbon': '1f380',
-    'closed_umbrella': '1f302',
-    'lipstick': '1f484',
-    'yellow_heart': '1f49b',
-    'blue_heart': '1f499',
-    'purple_heart': '1f49c',
-    'green_heart': '1f49a',
-    'heart': '2764',
-    'broken_heart': '1f494',
-    'heartpulse': '1f497',
-    'heartbeat': '1f493',
-    'two_hearts': '1f495',
-    'sparkling_heart': '1f496',
-    'revolving_hearts': '1f49e',
-    'cupid': '1f498',
-    'love_letter': '1f48c',
-    'kiss': '1f48b',
-    'ring': '1f48d',
-    'gem': '1f48e',
-    'bust_in_silhouette': '1f464',
-    'busts_in_silhouette': '1f465',
-    'speech_balloon': '1f4ac',
-    'footprints': '1f463',
-    'thought_balloon': '1f4ad',
-    'dog': '1f436',
-    'wolf': '1f43a',
-    'cat': '1f431',
-    'mouse': '1f42d',
-    'hamster': '1f439',
-    'rabbit': '1f430',
-    'frog': '1f438',
-    'tiger': '1f42f',
-    'koala': '1f428',
-    'bear': '1f43b',
-    'pig': '1f437',
-    'pig_nose': '1f43d',
-    'cow': '1f42e',
-    'boar': '1f417',
-    'monkey_face': '1f435',
-    'monkey': '1f412',
-    'horse': '1f434',
-    'sheep': '1f411',
-    'elephant': '1f418',
-    'panda_face': '1f43c',
-    'penguin': '1f427',
-    'bird': '1f426',
-    'baby_chick': '1f424',
-    'hatched_chick': '1f425',
-    'hatching_chick': '1f423',
-    'chicken': '1f414',
-    'snake': '1f40d',
-    'turtle': '1f422',
-    'bug': '1f41b',
-    'bee': '1f41d',
-    'honeybee': '1f41d',
-    'ant': '1f41c',
-    'beetle': '1f41e',
-    'snail': '1f40c',
-    'octopus': '1f419',
-    'shell': '1f41a',
-    'tropical_fish': '1f420',
-    'fish': '1f41f',
-    'dolphin': '1f42c',
-    'flipper': '1f42c',
-    'whale': '1f433',
-    'whale2': '1f40b',
-    'cow2': '1f404',
-    'ram': '1f40f',
-    'rat': '1f400',
-    'water_buffalo': '1f403',
-    'tiger2': '1f405',
-    'rabbit2': '1f407',
-    'dragon': '1f409',
-    'racehorse': '1f40e',
-    'goat': '1f410',
-    'rooster': '1f413',
-    'dog2': '1f415',
-    'pig2': '1f416',
-    'mouse2': '1f401',
-    'ox': '1f402',
-    'dragon_face': '1f432',
-    'blowfish': '1f421',
-    'crocodile': '1f40a',
-    'camel': '1f42b',
-    'dromedary_camel': '1f42a',
-    'leopard': '1f406',
-    'cat2': '1f408',
-    'poodle': '1f429',
-    'feet': '1f43e',
-    'paw_prints': '1f43e',
-    'bouquet': '1f490',
-    'cherry_blossom': '1f338',
-    'tulip': '1f337',
-    'four_leaf_clover': '1f340',
-    'rose': '1f339',
-    'sunflower': '1f33b',
-    'hibiscus': '1f33a',
-    'maple_leaf': '1f341',
-    'leaves': '1f343',
-    'fallen_leaf': '1f342',
-    'herb': '1f33f',
-    'ear_of_rice': '1f33e',
-    'mushroom': '1f344',
-    'cactus': '1f335',
-    'palm_tree': '1f334',
-    'evergreen_tree': '1f332',
-    'deciduous_tree': '1f333',
-    'chestnut': '1f330',
-    'seedling': '1f331',
-    'blossom': '1f33c',
-    'globe_with_meridians': '1f310',
-    'sun_with_face': '1f31e',
-    'full_moon_with_face': '1f31d',
-    'new_moon_with_face': '1f31a',
-    'new_moon': '1f311',
-    'waxing_crescent_moon': '1f312',
-    'first_quarter_moon': '1f313',
-    'moon': '1f314',
-    'waxing_gibbous_moon': '1f314',
-    'full_moon': '1f315',
-    'waning_gibbous_moon': '1f316',
-    'last_quarter_moon': '1f317',
-    'waning_crescent_moon': '1f318',
-    'last_quarter_moon_with_face': '1f31c',
-    'first_quarter_moon_with_face': '1f31b',
-    'crescent_moon': '1f319',
-    'earth_africa': '1f30d',
-    'earth_americas': '1f30e',
-    'earth_asia': '1f30f',
-    'volcano': '1f30b',
-    'milky_way': '1f30c',
-    'stars': '1f320',
-    'star': '2b50',
-    'sunny': '2600',
-    'partly_sunny': '26c5',
-    'cloud': '2601',
-    'zap': '26a1',
-    'umbrella': '2614',
-    'snowflake': '2744',
-    'snowman': '26c4',
-    'cyclone': '1f300',
-    'foggy': '1f301',
-    'rainbow': '1f308',
-    'ocean': '1f30a',
-    'bamboo': '1f38d',
-    'gift_heart': '1f49d',
-    'dolls': '1f38e',
-    'school_satchel': '1f392',
-    'mortar_board': '1f393',
-    'flags': '1f38f',
-    'fireworks': '1f386',
-    'sparkler': '1f387',
-    'wind_chime': '1f390',
-    'rice_scene': '1f391',
-    'jack_o_lantern': '1f383',
-    'ghost': '1f47b',
-    'santa': '1f385',
-    'christmas_tree': '1f384',
-    'gift': '1f381',
-    'tanabata_tree': '1f38b',
-    'tada': '1f389',
-    'confetti_ball': '1f38a',
-    'balloon': '1f388',
-    'crossed_flags': '1f38c',
-    'crystal_ball': '1f52e',
-    'movie_camera': '1f3a5',
-    'camera': '1f4f7',
-    'video_camera': '1f4f9',
-    'vhs': '1f4fc',
-    'cd': '1f4bf',
-    'dvd': '1f4c0',
-    'minidisc': '1f4bd',
-    'floppy_disk': '1f4be',
-    'computer': '1f4bb',
-    'iphone': '1f4f1',
-    'phone': '260e',
-    'telephone': '260e',
-    'telephone_receiver': '1f4de',
-    'pager': '1f4df',
-    'fax': '1f4e0',
-    'satellite': '1f4e1',
-    'tv': '1f4fa',
-    'radio': '1f4fb',
-    'loud_sound': '1f50a',
-    'sound': '1f509',
-    'speaker': '1f508',
-    'mute': '1f507',
-    'bell': '1f514',
-    'no_bell': '1f515',
-    'loudspeaker': '1f4e2',
-    'mega': '1f4e3',
-    'hourglass_flowing_sand': '23f3',
-    'hourglass': '231b',
-    'alarm_clock': '23f0',
-    'watch': '231a',
-    'unlock': '1f513',
-    'lock': '1f512',
-    'lock_with_ink_pen': '1f50f',
-    'closed_lock_with_key': '1f510',
-    'key': '1f511',
-    'mag_right': '1f50e',
-    'bulb': '1f4a1',
-    'flashlight': '1f526',
-    'high_brightness': '1f506',
-    'low_brightness': '1f505',
-    'electric_plug': '1f50c',
-    'battery': '1f50b',
-    'mag': '1f50d',
-    'bathtub': '1f6c1',
-    'bath': '1f6c0',
-    'shower': '1f6bf',
-    'toilet': '1f6bd',
-    'wrench': '1f527',
-    'nut_and_bolt': '1f529',
-    'hammer': '1f528',
-    'door': '1f6aa',
-    'smoking': '1f6ac',
-    'bomb': '1f4a3',
-    'gun': '1f52b',
-    'hocho': '1f52a',
-    'knife': '1f52a',
-    'pill': '1f48a',
-    'syringe': '1f489',
-    'moneybag': '1f4b0',
-    'yen': '1f4b4',
-    'dollar': '1f4b5',
-    'pound': '1f4b7',
-    'euro': '1f4b6',
-    'credit_card': '1f4b3',
-    'money_with_wings': '1f4b8',
-    'calling': '1f4f2',
-    'e-mail': '1f4e7',
-    'inbox_tray': '1f4e5',
-    'outbox_tray': '1f4e4',
-    'email': '2709',
-    'envelope': '2709',
-    'envelope_with_arrow': '1f4e9',
-    'incoming_envelope': '1f4e8',
-    'postal_horn': '1f4ef',
-    'mailbox': '1f4eb',
-    'mailbox_closed': '1f4ea',
-    'mailbox_with_mail': '1f4ec',
-    'mailbox_with_no_mail': '1f4ed',
-    'postbox': '1f4ee',
-    'package': '1f4e6',
-    'memo': '1f4dd',
-    'pencil': '1f4dd',
-    'page_facing_up': '1f4c4',
-    'page_with_curl': '1f4c3',
-    'bookmark_tabs': '1f4d1',
-    'bar_chart': '1f4ca',
-    'chart_with_upwards_trend': '1f4c8',
-    'chart_with_downwards_trend': '1f4c9',
-    'scroll': '1f4dc',
-    'clipboard': '1f4cb',
-    'date': '1f4c5',
-    'calendar': '1f4c6',
-    'card_index': '1f4c7',
-    'file_folder': '1f4c1',
-    'open_file_folder': '1f4c2',
-    'scissors': '2702',
-    'pushpin': '1f4cc',
-    'paperclip': '1f4ce',
-    'black_nib': '2712',
-    'pencil2': '270f',
-    'straight_ruler': '1f4cf',
-    'triangular_ruler': '1f4d0',
-    'closed_book': '1f4d5',
-    'green_book': '1f4d7',
-    'blue_book': '1f4d8',
-    'orange_book': '1f4d9',
-    'notebook': '1f4d3',
-    'notebook_with_decorative_cover': '1f4d4',
-    'ledger': '1f4d2',
-    'books': '1f4da',
-    'book': '1f4d6',
-    'open_book': '1f4d6',
-    'bookmark': '1f516',
-    'name_badge': '1f4db',
-    'microscope': '1f52c',
-    'telescope': '1f52d',
-    'newspaper': '1f4f0',
-    'art': '1f3a8',
-    'clapper': '1f3ac',
-    'microphone': '1f3a4',
-    'headphones': '1f3a7',
-    'musical_score': '1f3bc',
-    'musical_note': '1f3b5',
-    'notes': '1f3b6',
-    'musical_keyboard': '1f3b9',
-    'violin': '1f3bb',
-    'trumpet': '1f3ba',
-    'saxophone': '1f3b7',
-    'guitar': '1f3b8',
-    'space_invader': '1f47e',
-    'video_game': '1f3ae',
-    'black_joker': '1f0cf',
-    'flower_playing_cards': '1f3b4',
-    'mahjong': '1f004',
-    'game_die': '1f3b2',
-    'dart': '1f3af',
-    'football': '1f3c8',
-    'basketball': '1f3c0',
-    'soccer': '26bd',
-    'baseball': '26be',
-    'tennis': '1f3be',
-    '8ball': '1f3b1',
-    'rugby_football': '1f3c9',
-    'bowling': '1f3b3',
-    'golf': '26f3',
-    'mountain_bicyclist': '1f6b5',
-    'bicyclist': '1f6b4',
-    'checkered_flag': '1f3c1',
-    'horse_racing': '1f3c7',
-    'trophy': '1f3c6',
-    'ski': '1f3bf',
-    'snowboarder': '1f3c2',
-    'swimmer': '1f3ca',
-    'surfer': '1f3c4',
-    'fishing_pole_and_fish': '1f3a3',
-    'coffee': '2615',
-    'tea': '1f375',
-    'sake': '1f376',
-    'baby_bottle': '1f37c',
-    'beer': '1f37a',
-    'beers': '1f37b',
-    'cocktail': '1f378',
-    'tropical_drink': '1f379',
-    'wine_glass': '1f377',
-    'fork_and_knife': '1f374',
-    'pizza': '1f355',
-    'hamburger': '1f354',
-    'fries': '1f35f',
-    'poultry_leg': '1f357',
-    'meat_on_bone': '1f356',
-    'spaghetti': '1f35d',
-    'curry': '1f35b',
-    'fried_shrimp': '1f364',
-    'bento': '1f371',
-    'sushi': '1f363',
-    'fish_cake': '1f365',
-    'rice_ball': '1f359',
-    'rice_cracker': '1f358',
-    'rice': '1f35a',
-    'ramen': '1f35c',
-    'stew': '1f372',
-    'oden': '1f362',
-    'dango': '1f361',
-    'egg': '1f373',
-    'bread': '1f35e',
-    'doughnut': '1f369',
-    'custard': '1f36e',
-    'icecream': '1f366',
-    'ice_cream': '1f368',
-    'shaved_ice': '1f367',
-    'birthday': '1f382',
-    'cake': '1f370',
-    'cookie': '1f36a',
-    'chocolate_bar': '1f36b',
-    'candy': '1f36c',
-    'lollipop': '1f36d',
-    'honey_pot': '1f36f',
-    'apple': '1f34e',
-    'green_apple': '1f34f',
-    'tangerine': '1f34a',
-    'orange': '1f34a',
-    'mandarin': '1f34a',
-    'lemon': '1f34b',
-    'cherries': '1f352',
-    'grapes': '1f347',
-    'watermelon': '1f349',
-    'strawberry': '1f353',
-    'peach': '1f351',
-    'melon': '1f348',
-    'banana': '1f34c',
-    'pear': '1f350',
-    'pineapple': '1f34d',
-    'sweet_potato': '1f360',
-    'eggplant': '1f346',
-    'tomato': '1f345',
-    'corn': '1f33d',
-    'house': '1f3e0',
-    'house_with_garden': '1f3e1',
-    'school': '1f3eb',
-    'office': '1f3e2',
-    'post_office': '1f3e3',
-    'hospital': '1f3e5',
-    'bank': '1f3e6',
-    'convenience_store': '1f3ea',
-    'love_hotel': '1f3e9',
-    'hotel': '1f3e8',
-    'wedding': '1f492',
-    'church': '26ea',
-    'department_store': '1f3ec',
-    'european_post_office': '1f3e4',
-    'city_sunrise': '1f307',
-    'city_sunset': '1f306',
-    'japanese_castle': '1f3ef',
-    'european_castle': '1f3f0',
-    'tent': '26fa',
-    'factory': '1f3ed',
-    'tokyo_tower': '1f5fc',
-    'japan': '1f5fe',
-    'mount_fuji': '1f5fb',
-    'sunrise_over_mountains': '1f304',
-    'sunrise': '1f305',
-    'night_with_stars': '1f303',
-    'statue_of_liberty': '1f5fd',
-    'bridge_at_night': '1f309',
-    'carousel_horse': '1f3a0',
-    'ferris_wheel': '1f3a1',
-    'fountain': '26f2',
-    'roller_coaster': '1f3a2',
-    'ship': '1f6a2',
-    'boat': '26f5',
-    'sailboat': '26f5',
-    'speedboat': '1f6a4',
-    'rowboat': '1f6a3',
-    'anchor': '2693',
-    'rocket': '1f680',
-    'airplane': '2708',
-    'seat': '1f4ba',
-    'helicopter': '1f681',
-    'steam_locomotive': '1f682',
-    'tram': '1f68a',
-    'station': '1f689',
-    'mountain_railway': '1f69e',
-    'train2': '1f686',
-    'bullettrain_side': '1f684',
-    'bullettrain_front': '1f685',
-    'light_rail': '1f688',
-    'metro': '1f687',
-    'monorail': '1f69d',
-    'train': '1f68b',
-    'railway_car': '1f683',
-    'trolleybus': '1f68e',
-    'bus': '1f68c',
-    'oncoming_bus': '1f68d',
-    'blue_car': '1f699',
-    'oncoming_automobile': '1f698',
-    'car': '1f697',
-    'red_car': '1f697',
-    'taxi': '1f695',
-    'oncoming_taxi': '1f696',
-    'articulated_lorry': '1f69b',
-    'truck': '1f69a',
-    'rotating_light': '1f6a8',
-    'police_car': '1f693',
-    'oncoming_police_car': '1f694',
-    'fire_engine': '1f692',
-    'ambulance': '1f691',
-    'minibus': '1f690',
-    'bike': '1f6b2',
-    'aerial_tramway': '1f6a1',
-    'suspension_railway': '1f69f',
-    'mountain_cableway': '1f6a0',
-    'tractor': '1f69c',
-    'barber': '1f488',
-    'busstop': '1f68f',
-    'ticket': '1f3ab',
-    'vertical_traffic_light': '1f6a6',
-    'traffic_light': '1f6a5',
-    'warning': '26a0',
-    'construction': '1f6a7',
-    'beginner': '1f530',
-    'fuelpump': '26fd',
-    'izakaya_lantern': '1f3ee',
-    'lantern': '1f3ee',
-    'slot_machine': '1f3b0',
-    'hotsprings': '2668',
-    'moyai': '1f5ff',
-    'circus_tent': '1f3aa',
-    'performing_arts': '1f3ad',
-    'round_pushpin': '1f4cd',
-    'triangular_flag_on_post': '1f6a9',
-    'jp': '1f1ef-1f1f5',
-    'kr': '1f1f0-1f1f7',
-    'de': '1f1e9-1f1ea',
-    'cn': '1f1e8-1f1f3',
-    'us': '1f1fa-1f1f8',
-    'fr': '1f1eb-1f1f7',
-    'es': '1f1ea-1f1f8',
-    'it': '1f1ee-1f1f9',
-    'ru': '1f1f7-1f1fa',
-    'gb': '1f1ec-1f1e7',
-    'uk': '1f1ec-1f1e7',
-    'one': '0031-20e3',
-    'two': '0032-20e3',
-    'three': '0033-20e3',
-    'four': '0034-20e3',
-    'five': '0035-20e3',
-    'six': '0036-20e3',
-    'seven': '0037-20e3',
-    'eight': '0038-20e3',
-    'nine': '0039-20e3',
-    'zero': '0030-20e3',
-    'keycap_ten': '1f51f',
-    '1234': '1f522',
-    'hash': '0023-20e3',
-    'symbols': '1f523',
-    'arrow_up': '2b06',
-    'arrow_down': '2b07',
-    'arrow_left': '2b05',
-    'arrow_right': '27a1',
-    'capital_abcd': '1f520',
-    'abcd': '1f521',
-    'abc': '1f524',
-    'arrow_upper_right': '2197',
-    'arrow_upper_left': '2196',
-    'arrow_lower_right': '2198',
-    'arrow_lower_left': '2199',
-    'left_right_arrow': '2194',
-    'arrow_up_down': '2195',
-    'arrows_counterclockwise': '1f504',
-    'arrow_backward': '25c0',
-    'arrow_forward': '25b6',
-    'arrow_up_small': '1f53c',
-    'arrow_down_small': '1f53d',
-    'leftwards_arrow_with_hook': '21a9',
-    'arrow_right_hook': '21aa',
-    'information_source': '2139',
-    'rewind': '23ea',
-    'fast_forward': '23e9',
-    'arrow_double_up': '23eb',
-    'arrow_double_down': '23ec',
-    'arrow_heading_down': '2935',
-    'arrow_heading_up': '2934',
-    'ok': '1f197',
-    'twisted_rightwards_arrows': '1f500',
-    'repeat': '1f501',
-    'repeat_one': '1f502',
-    'new': '1f195',
-    'up': '1f199',
-    'cool': '1f192',
-    'free': '1f193',
-    'ng': '1f196',
-    'signal_strength': '1f4f6',
-    'cinema': '1f3a6',
-    'koko': '1f201',
-    'u6307': '1f22f',
-    'u7a7a': '1f233',
-    'u6e80': '1f235',
-    'u5408': '1f234',
-    'u7981': '1f232',
-    'ideograph_advantage': '1f250',
-    'u5272': '1f239',
-    'u55b6': '1f23a',
-    'u6709': '1f236',
-    'u7121': '1f21a',
-    'restroom': '1f6bb',
-    'mens': '1f6b9',
-    'womens': '1f6ba',
-    'baby_symbol': '1f6bc',
-    'wc': '1f6be',
-    'potable_water': '1f6b0',
-    'put_litter_in_its_place': '1f6ae',
-    'parking': '1f17f',
-    'wheelchair': '267f',
-    'no_smoking': '1f6ad',
-    'u6708': '1f237',
-    'u7533': '1f238',
-    'sa': '1f202',
-    'm': '24c2',
-    'passport_control': '1f6c2',
-    'baggage_claim': '1f6c4',
-    'left_luggage': '1f6c5',
-    'customs': '1f6c3',
-    'accept': '1f251',
-    'secret': '3299',
-    'congratulations': '3297',
-    'cl': '1f191',
-    'sos': '1f198',
-    'id': '1f194',
-    'no_entry_sign': '1f6ab',
-    'underage': '1f51e',
-    'no_mobile_phones': '1f4f5',
-    'do_not_litter': '1f6af',
-    'non-potable_water': '1f6b1',
-    'no_bicycles': '1f6b3',
-    'no_pedestrians': '1f6b7',
-    'children_crossing': '1f6b8',
-    'no_entry': '26d4',
-    'eight_spoked_asterisk': '2733',
-    'sparkle': '2747',
-    'negative_squared_cross_mark': '274e',
-    'white_check_mark': '2705',
-    'eight_pointed_black_star': '2734',
-    'heart_decoration': '1f49f',
-    'vs': '1f19a',
-    'vibration_mode': '1f4f3',
-    'mobile_phone_off': '1f4f4',
-    'a': '1f170',
-    'b': '1f171',
-    'ab': '1f18e',
-    'o2': '1f17e',
-    'diamond_shape_with_a_dot_inside': '1f4a0',
-    'loop': '27bf',
-    'recycle': '267b',
-    'aries': '2648',
-    'taurus': '2649',
-    'gemini': '264a',
-    'cancer': '264b',
-    'leo': '264c',
-    'virgo': '264d',
-    'libra': '264e',
-    'scorpius': '264f',
-    'sagittarius': '2650',
-    'capricorn': '2651',
-    'aquarius': '2652',
-    'pisces': '2653',
-    'ophiuchus': '26ce',
-    'six_pointed_star': '1f52f',
-    'atm': '1f3e7',
-    'chart': '1f4b9',
-    'heavy_dollar_sign': '1f4b2',
-    'currency_exchange': '1f4b1',
-    'copyright': '00a9',
-    'registered': '00ae',
-    'tm': '2122',
-    'x': '274c',
-    'bangbang': '203c',
-    'interrobang': '2049',
-    'exclamation': '2757',
-    'heavy_exclamation_mark': '2757',
-    'question': '2753',
-    'grey_exclamation': '2755',
-    'grey_question': '2754',
-    'o': '2b55',
-    'top': '1f51d',
-    'end': '1f51a',
-    'back': '1f519',
-    'on': '1f51b',
-    'soon': '1f51c',
-    'arrows_clockwise': '1f503',
-    'clock12': '1f55b',
-    'clock1230': '1f567',
-    'clock1': '1f550',
-    'clock130': '1f55c',
-    'clock2': '1f551',
-    'clock230': '1f55d',
-    'clock3': '1f552',
-    'clock330': '1f55e',
-    'clock4': '1f553',
-    'clock430': '1f55f',
-    'clock5': '1f554',
-    'clock530': '1f560',
-    'clock6': '1f555',
-    'clock7': '1f556',
-    'clock8': '1f557',
-    'clock9': '1f558',
-    'clock10': '1f559',
-    'clock11': '1f55a',
-    'clock630': '1f561',
-    'clock730': '1f562',
-    'clock830': '1f563',
-    'clock930': '1f564',
-    'clock1030': '1f565',
-    'clock1130': '1f566',
-    'heavy_multiplication_x': '2716',
-    'heavy_plus_sign': '2795',
-    'heavy_minus_sign': '2796',
-    'heavy_division_sign': '2797',
-    'spades': '2660',
-    'hearts': '2665',
-    'clubs': '2663',
-    'diamonds': '2666',
-    'white_flower': '1f4ae',
-    '100': '1f4af',
-    'heavy_check_mark': '2714',
-    'ballot_box_with_check': '2611',
-    'radio_button': '1f518',
-    'link': '1f517',
-    'curly_loop': '27b0',
-    'wavy_dash': '3030',
-    'part_alternation_mark': '303d',
-    'trident': '1f531',
-    'black_medium_square': '25fc',
-    'white_medium_square': '25fb',
-    'black_medium_small_square': '25fe',
-    'white_medium_small_square': '25fd',
-    'black_small_square': '25aa',
-    'white_small_square': '25ab',
-    'small_red_triangle': '1f53a',
-    'black_square_button': '1f532',
-    'white_square_button': '1f533',
-    'black_circle': '26ab',
-    'white_circle': '26aa',
-    'red_circle': '1f534',
-    'large_blue_circle': '1f535',
-    'small_red_triangle_down': '1f53b',
-    'white_large_square': '2b1c',
-    'black_large_square': '2b1b',
-    'large_orange_diamond': '1f536',
-    'large_blue_diamond': '1f537',
-    'small_orange_diamond': '1f538',
-    'small_blue_diamond': '1f539',
-    'ca': '1f1e8-1f1e6',
-    'eh': '1f1e8-1f1e6',
-    'pk': '1f1f5-1f1f0',
-    'za': '1f1ff-1f1e6',
-    'slightly_smiling_face': '1f642',
-    'slightly_frowning_face': '1f641',
-    'upside_down_face': '1f643',
-    'mm': 'mm',
-    'mattermost': 'mattermost',
-    'basecamp': 'basecamp',
-    'basecampy': 'basecampy',
-    'bowtie': 'bowtie',
-    'feelsgood': 'feelsgood',
-    'finnadie': 'finnadie',
-    'fu': 'fu',
-    'goberserk': 'goberserk',
-    'godmode': 'godmode',
-    'hurtrealbad': 'hurtrealbad',
-    'metal': 'metal',
-    'neckbeard': 'neckbeard',
-    'octocat': 'octocat',
-    'rage1': 'rage1',
-    'rage2': 'rage2',
-    'rage3': 'rage3',
-    'rage4': 'rage4',
-    'shipit': 'shipit',
-    'squirrel': 'squirrel',
-    'suspect': 'suspect',
-    'taco': 'taco',
-    'trollface': 'trollface',
+# suffixes of rotated, backup and template copies, looked through when
+# detecting the syntax of a file name
+rotated_exts = frozenset(['.orig', '.bak', '.old', '.rej', '.save', '.swp', '.tmp',
+                          '.dist', '.sample', '.in'])
+
+# shebang interpreters and vim/emacs modeline names
+syntax_aliases = {
+    'sh': 'bash', 'zsh': 'bash', 'ksh': 'bash', 'dash': 'bash', 'ash': 'bash',
+    'node': 'javascript', 'nodejs': 'javascript', 'js': 'javascript',
+    'make': 'makefile', 'coffee': 'coffeescript', 'c': 'cpp', 'c++': 'cpp',
+    'objc': 'objectivec', 'tex': 'latex', 'dosini': 'ini', 'csharp': 'cs',
+    'patch': 'diff', 'html': 'xml', 'py': 'python', 'rb': 'ruby', 'pl': 'perl',
 }
 
+# syntax detection: bytes of content looked at for shebangs and modelines,
+# and detections from file names cached by (basename, mime) in LRU order
+syntax_sniff_size = 512
+syntax_cache_size = 1024
+_syntax_cache = OrderedDict()
+
+_emoji_to_code = None
+_emoji_unicode = None
+_emoji_pattern = None
+
+
+def get_emoji_map():
+    global _emoji_to_code
+    if _emoji_to_code is None:
+        from mattersend_emoji import emoji_data
+
+        emojis = {}
+        for line in emoji_data.splitlines():
+            emoji, _, code = line.partition(' ')
+            emojis[emoji] = code or emoji
+        _emoji_to_code = emojis
+    return _emoji_to_code
+
+
+class EmojiMap:
+    # emoji_to_code used to be a module level dict: a read-only view of
+    # get_emoji_map() keeps it importable without parsing the data at import
+
+    def __getitem__(self, emoji):
+        return get_emoji_map()[emoji]
+
+    def __contains__(self, emoji):
+        return emoji in get_emoji_map()
+
+    def __iter__(self):
+        return iter(get_emoji_map())
+
+    def __len__(self):
+        return len(get_emoji_map())
+
+    def __eq__(self, other):
+        return get_emoji_map() == other
+
+    def __repr__(self):
+        return repr(get_emoji_map())
+
+    def __getattr__(self, attr):
+        # get(), keys(), items(), values(), copy()
+        return getattr(get_emoji_map(), attr)
+
+
+emoji_to_code = EmojiMap()
+
+
+def expand_emoji(text):
+    # one regex pass: code fences and inline code are matched first and kept
+    # as they are, known :shortcodes: become their unicode characters and
+    # custom emojis without one are left alone
+    global _emoji_unicode, _emoji_pattern
 
-def detect_syntax(basename, mime):
+    if ':' not in text:
+        return text
+
+    if _emoji_pattern is None:
+        import re
+
+        unicode = {}
+        for emoji, code in get_emoji_map().items():
+            try:
+                unicode[emoji] = ''.join(chr(int(c, 16)) for c in code.split('-'))
+            except ValueError:
+                pass
+        _emoji_unicode = unicode
+        # the closing colon is only looked ahead: in 10:30:smile: an unknown
+        # :30: must leave it for :smile:
+        _emoji_pattern = re.compile(r'```.*?(?:```|\Z)|`[^`\n]*`|:([a-z0-9_+-]+)(?=:)', re.DOTALL)
+
+    parts = []
+    end = 0
+    for match in _emoji_pattern.finditer(text):
+        emoji = match.group(1)
+        # starting on the closing colon of an expanded emoji
+        if match.start() < end or emoji not in _emoji_unicode:
+            continue
+        parts.append(text[end:match.start()])
+        parts.append(_emoji_unicode[emoji])
+        end = match.end() + 1
+
+    parts.append(text[end:])
+    return ''.join(parts)
+
+
+def detect_syntax(basename, mime, head=None):
+    # head is the beginning of the content, only looked at when the name
+    # and mime say nothing
+    key = (basename, mime)
+    with _cache_lock:
+        cached = key in _syntax_cache
+        if cached:
+            _syntax_cache.move_to_end(key)
+            syntax = _syntax_cache[key]
+    if not cached:
+        syntax = syntax_from_name(basename, mime)
+        with _cache_lock:
+            _syntax_cache[key] = syntax
+            while len(_syntax_cache) > syntax_cache_size:
+                _syntax_cache.popitem(last=False)
+
+    if syntax is None and head:
+        syntax = syntax_from_content(head)
+    return syntax
+
+
+def syntax_from_name(basename, mime):
     if mime in mime_to_syntax:
         return mime_to_syntax[mime]
 
-    (_, ext) = os.path.splitext(basename)
-    if not ext:
-        ext = basename
-    return ext_to_syntax[ext] if ext in ext_to_syntax else None
+    name = basename.rstrip('~')
+    while True:
+        root, ext = os.path.splitext(name)
+        if not ext:
+            return ext_to_syntax.get(name) or ext_to_syntax.get(name.lower())
+        # compound extensions mapped as a whole win over their last part
+        syntax = ext_to_syntax.get(os.path.splitext(root)[1] + ext) or ext_to_syntax.get(ext.lower())
+        if syntax is not None:
+            return syntax
+        if ext.lower() not in rotated_exts and not ext[1:].isdigit():
+            return None
+        name = root
+
+
+def syntax_from_content(head):
+    import re
+
+    head = head[:syntax_sniff_size]
+    lines = head.splitlines()
+    if not lines:
+        return None
+
+    names = []
+    if lines[0].startswith('#!'):
+        words = lines[0][2:].split()
+        if words and os.path.basename(words[0]) == 'env':
+            words = [w for w in words[1:] if not w.startswith('-') and '=' not in w]
+        if words:
+            names.append(os.path.basename(words[0]))
+    elif lines[0].startswith('<?php'):
+        return 'php'
+    elif lines[0].startswith('<?xml'):
+        return 'xml'
+    elif lines[0].startswith('diff ') or (lines[0].startswith('--- ') and '\n+++ ' in head):
+        return 'diff'
+
+    # vim: set ft=python: / vi: filetype=sh / -*- mode: perl -*-
+    for line in lines[:5]:
+        match = (re.search(r'\b(?:vi|vim|ex):.*?\b(?:ft|filetype|syntax)=([\w+]+)', line) or
+                 re.search(r'-\*-.*?\bmode:\s*([\w+]+)', line) or
+                 re.search(r'-\*-\s*([\w+]+)\s*-\*-', line))
+        if match:
+            names.append(match.group(1))
+
+    for name in names:
+        name = name.lower()
+        # python3, python3.11, perl5
+        name = name.rstrip('0123456789.') or name
+        if name in syntax_aliases:
+            return syntax_aliases[name]
+        if name in syntaxes and name not in ('plain', 'auto'):
+            return name
+    return None
 
 
 def sizeof_fmt(num, suffix='B'):
@@ -1006,41 +336,1266 @@ def sizeof_fmt(num, suffix='B'):
     return "%.1f%s%s" % (num, 'Yi', suffix)
 
 
-def md_table(data):
-    md = []
-    for i, row in enumerate(data):
+def add_timing_hook(hook):
+    timing_hooks.append(hook)
+    return hook
+
+
+def remove_timing_hook(hook):
+    timing_hooks.remove(hook)
+
+
+class Timer:
+    # reports the duration of a phase and the bytes it handled to the timing
+    # hooks, the clock is not even read when there are none
+    __slots__ = ('phase', 'nbytes', 'start')
+
+    def __init__(self, phase, nbytes=0):
+        self.phase = phase
+        self.nbytes = nbytes
+        self.start = None
+
+    def __enter__(self):
+        if timing_hooks:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.start is not None:
+            elapsed = time.perf_counter() - self.start
+            for hook in list(timing_hooks):
+                hook(self.phase, elapsed, self.nbytes)
+
+
+class Timings:
+    # timing hook adding up calls, durations and bytes of every phase
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases = {}
+        self.start = time.perf_counter()
+
+    def __call__(self, phase, seconds, nbytes):
+        with self.lock:
+            calls, total, size = self.phases.get(phase, (0, 0.0, 0))
+            self.phases[phase] = (calls + 1, total + seconds, size + nbytes)
+
+    def report(self):
+        lines = ["{:10} {:>6} {:>10} {:>10}".format('phase', 'calls', 'ms', 'bytes')]
+        with self.lock:
+            for phase, (calls, seconds, nbytes) in self.phases.items():
+                lines.append("{:10} {:6} {:10.2f} {:>10}".format(
+                    phase, calls, seconds * 1000, sizeof_fmt(nbytes) if nbytes else ''))
+        lines.append("{:10} {:6} {:10.2f}".format('total', '', (time.perf_counter() - self.start) * 1000))
+        return "\n".join(lines) + "\n"
+
+
+class HTTPResponse:
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+
+class HTTPClientSession:
+    # the subset of requests.Session used by post(), on top of http.client.
+    # Keeps up to pool_size idle keep-alive connections per host, honours
+    # the http(s)_proxy and no_proxy variables and applies http_timeout to
+    # connecting and to every read.
+    def __init__(self, pool_size=None, timeout=None):
+        self.pool_size = globals()['pool_size'] if pool_size is None else pool_size
+        self.timeout = http_timeout if timeout is None else timeout
+        self.lock = threading.Lock()
+        self.idle = {}
+
+    def post(self, url, data=None, headers=None):
+        import http.client
+        from urllib.parse import urlsplit
+
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise IOError("Invalid webhook URL {!r}".format(url))
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        key = (parts.scheme, parts.netloc)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+
+        # a kept-alive connection closed by the server fails on first use
+        for reuse in (True, False):
+            conn, proxied = self.connection(key, parts, reuse)
+            try:
+                conn.request('POST', url if proxied else target, body=data, headers=headers or {})
+                r = conn.getresponse()
+                content = r.read()
+            except (ConnectionError, http.client.BadStatusLine) as e:
+                conn.close()
+                if reuse and getattr(conn, 'reused', False):
+                    continue
+                raise IOError("{}: {}".format(url, e))
+            except (OSError, http.client.HTTPException) as e:
+                conn.close()
+                raise IOError("{}: {}".format(url, e))
+            except BaseException:
+                conn.close()
+                raise
+            break
+
+        if r.will_close:
+            conn.close()
+        else:
+            self.release(key, conn)
+        return HTTPResponse(r.status, content, r.headers)
+
+    def connection(self, key, parts, reuse=True):
+        # returns the connection and whether it goes through a plain http proxy
+        proxy = self.proxy(parts)
+        if reuse:
+            with self.lock:
+                idle = self.idle.get(key)
+                if idle:
+                    conn = idle.pop()
+                    conn.reused = True
+                    return conn, proxy is not None and parts.scheme == 'http'
+
+        import http.client
+
+        port = parts.port
+        if proxy is not None:
+            from urllib.parse import urlsplit
+            proxy = urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+            if parts.scheme == 'http':
+                return http.client.HTTPConnection(proxy.hostname, proxy.port, timeout=self.timeout), True
+            conn = http.client.HTTPSConnection(proxy.hostname, proxy.port or 80, timeout=self.timeout)
+            conn.set_tunnel(parts.hostname, port or 443)
+            return conn, False
+
+        if parts.scheme == 'https':
+            return http.client.HTTPSConnection(parts.hostname, port, timeout=self.timeout), False
+        return http.client.HTTPConnection(parts.hostname, port, timeout=self.timeout), False
+
+    def proxy(self, parts):
+        env = os.environ
+        proxy = env.get(parts.scheme + '_proxy') or env.get(parts.scheme.upper() + '_PROXY')
+        if not proxy:
+            return None
+
+        no_proxy = env.get('no_proxy') or env.get('NO_PROXY') or ''
+        host = parts.hostname.lower()
+        for domain in no_proxy.replace(',', ' ').split():
+            domain = domain.lower().lstrip('.')
+            if domain == '*' or host == domain or host.endswith('.' + domain):
+                return None
+        return proxy
+
+    def release(self, key, conn):
+        with self.lock:
+            idle = self.idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+def create_requests_session(pool_size=None, timeout=None):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    if pool_size is None:
+        pool_size = globals()['pool_size']
+    if timeout is None:
+        timeout = http_timeout
+
+    class Session(requests.Session):
+        def request(self, *args, **kwargs):
+            kwargs.setdefault('timeout', timeout)
+            return requests.Session.request(self, *args, **kwargs)
+
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# session factories taking (pool_size, timeout). Sessions need a
+# requests.Session compatible post(url, data, headers) and close()
+transports = {
+    'stdlib': HTTPClientSession,
+    'requests': create_requests_session,
+}
+
+
+def create_session(pool_size=None, backend=None, timeout=None):
+    return transports[backend or transport](pool_size, timeout)
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def configure_pool(size=None, backend=None, timeout=None):
+    # the shared session is recreated on next use
+    global pool_size, transport, http_timeout, _session
+    with _session_lock:
+        if size is not None:
+            pool_size = size
+        if backend is not None:
+            if backend not in transports:
+                raise ValueError("Unknown transport {!r}".format(backend))
+            transport = backend
+        if timeout is not None:
+            http_timeout = timeout
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+async def get_async_session():
+    global _async_sessions
+    import asyncio
+
+    if _async_sessions is None:
+        import weakref
+        _async_sessions = weakref.WeakKeyDictionary()
+
+    loop = asyncio.get_event_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=pool_size)
+        session = aiohttp.ClientSession(connector=connector)
+        _async_sessions[loop] = session
+    return session
+
+
+async def close_async_session():
+    import asyncio
+
+    if _async_sessions is None:
+        return
+
+    session = _async_sessions.pop(asyncio.get_event_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+def check_response(status_code, text):
+    if status_code != 200:
+        import json
+        try:
+            r = json.loads(text)
+        except ValueError:
+            r = {'message': text, 'status_code': status_code}
+        raise WebhookError("{} ({})".format(r['message'], r['status_code']), status_code)
+
+
+class WebhookError(RuntimeError):
+    def __init__(self, message, status_code=None):
+        super(WebhookError, self).__init__(message)
+        self.status_code = status_code
+
+
+class RateLimiter:
+    # token bucket shared by every request to the same webhook URL. The rate
+    # is learnt from the X-Ratelimit-* headers sent by mattermost, Retry-After
+    # and backoffs pause the bucket for every sender.
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # takes a token, or returns how many seconds to wait before retrying
+        with self.lock:
+            now = time.time()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.rate is None:
+                return 0
+
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        while delay:
+            time.sleep(delay)
+            delay = self.reserve()
+
+    def pause(self, delay):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.time() + delay)
+
+    def update(self, headers):
+        try:
+            limit = float(headers['X-Ratelimit-Limit'])
+            remaining = float(headers['X-Ratelimit-Remaining'])
+        except (KeyError, TypeError, ValueError):
+            return
+
+        with self.lock:
+            # stay just under the server limit
+            self.rate = max(limit * rate_limit_margin, 0.1)
+            self.burst = max(limit * rate_limit_margin, 1)
+            self.tokens = min(self.tokens, remaining)
+            self.updated = time.time()
+
+        if remaining < 1:
+            try:
+                self.pause(float(headers['X-Ratelimit-Reset']))
+            except (KeyError, TypeError, ValueError):
+                pass
+
+
+def get_rate_limiter(url):
+    with _session_lock:
+        limiter = _rate_limiters.get(url)
+        if limiter is None:
+            limiter = _rate_limiters[url] = RateLimiter()
+    return limiter
+
+
+def retry_delay(attempt, status_code, headers):
+    # None when the response must not be retried
+    if attempt >= max_retries or status_code not in retry_statuses:
+        return None
+
+    retry_after = headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            from email.utils import parsedate_tz, mktime_tz
+            date = parsedate_tz(retry_after)
+            if date is not None:
+                return max(0.0, mktime_tz(date) - time.time())
+
+    import random
+    return random.uniform(0.5, 1.0) * min(backoff_max, backoff_base * 2 ** attempt)
+
+
+def get_json_encoder():
+    global _json_encoder
+
+    if _json_encoder is None:
+        encoder = None
+        if json_backend != 'json':
+            try:
+                import orjson
+                encoder = orjson.dumps
+            except ImportError:
+                if json_backend == 'orjson':
+                    raise
+
+        if encoder is None:
+            import json
+            dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+            def encoder(data):
+                return dumps(data).encode('utf-8')
+
+        _json_encoder = encoder
+    return _json_encoder
+
+
+def encode_payload(data):
+    # raw utf-8 without whitespace, the pretty form is only for --dry-run
+    with Timer('serialize') as timer:
+        body = get_json_encoder()(data)
+        timer.nbytes = len(body)
+    return body
+
+
+def post(url, data, session=None):
+    if session is None:
+        session = get_session()
+
+    limiter = get_rate_limiter(url)
+    body = encode_payload(data)
+
+    attempt = 0
+    while True:
+        with Timer('throttle'):
+            limiter.acquire()
+        with Timer('http', len(body)):
+            r = session.post(url, data=body, headers=json_headers)
+        limiter.update(r.headers)
+
+        delay = retry_delay(attempt, r.status_code, r.headers)
+        if delay is None:
+            break
+        limiter.pause(delay)
+        attempt += 1
+
+    check_response(r.status_code, r.text)
+    return r
+
+
+async def post_async(url, data, session=None):
+    if session is None:
+        session = await get_async_session()
+
+    import asyncio
+
+    limiter = get_rate_limiter(url)
+    body = encode_payload(data)
+
+    attempt = 0
+    while True:
+        delay = limiter.reserve()
+        while delay:
+            await asyncio.sleep(delay)
+            delay = limiter.reserve()
+
+        with Timer('http', len(body)):
+            async with session.post(url, data=body, headers=json_headers) as r:
+                limiter.update(r.headers)
+                delay = retry_delay(attempt, r.status, r.headers)
+                if delay is None:
+                    check_response(r.status, await r.text())
+                    return r
+
+        limiter.pause(delay)
+        attempt += 1
+
+
+def spool_payload(directory, url, data):
+    # write to a temporary name and rename, so the drain worker never sees
+    # partial entries and an acknowledged message survives a crash
+    import json
+    global _spool_sequence
+
+    directory = os.path.expanduser(directory)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    with _session_lock:
+        _spool_sequence += 1
+        entry = "{:020d}-{}-{:06d}".format(int(time.time() * 1000000), os.getpid(), _spool_sequence)
+
+    path = os.path.join(directory, entry + '.json')
+    tmp_path = os.path.join(directory, '.' + entry + '.tmp')
+    with Timer('spool') as timer, open(tmp_path, 'w') as f:
+        json.dump({'url': url, 'data': data}, f)
+        f.flush()
+        os.fsync(f.fileno())
+        timer.nbytes = f.tell()
+    os.rename(tmp_path, path)
+
+    return path
+
+
+def drain(directory, max_workers=None, session=None):
+    # delivers spooled messages in order per webhook URL, several URLs at a
+    # time. Entries are removed only once the server accepted them (at least
+    # once delivery), rejected ones are moved to the failed/ subdirectory and
+    # the others are kept for the next run.
+    # Returns the number of sent, failed and kept entries.
+    import fcntl
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+
+    directory = os.path.expanduser(directory)
+    if not os.path.isdir(directory):
+        return 0, 0, 0
+
+    if max_workers is None:
+        max_workers = fanout_workers
+
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            raise RuntimeError('Spool {} is already being drained'.format(directory))
+
+        queues = {}
+        for entry in sorted(os.listdir(directory)):
+            path = os.path.join(directory, entry)
+            if entry.endswith('.json'):
+                try:
+                    with open(path, 'r') as f:
+                        message = json.load(f)
+                except ValueError:
+                    message = {'url': None, 'data': None}
+                queues.setdefault(message['url'], []).append((path, message['data']))
+            elif entry.endswith('.tmp') and os.path.getmtime(path) < time.time() - 3600:
+                # left over by a producer that crashed while spooling
+                os.remove(path)
+
+        def deliver(url, entries):
+            sent = failed = 0
+            for i, (path, data) in enumerate(entries):
+                try:
+                    if url is None:
+                        raise WebhookError('Invalid spool entry')
+                    post(url, data, session)
+                except WebhookError as e:
+                    if e.status_code is not None and (e.status_code == 429 or e.status_code >= 500):
+                        return sent, failed, len(entries) - i
+                    failed_dir = os.path.join(directory, 'failed')
+                    if not os.path.isdir(failed_dir):
+                        os.makedirs(failed_dir)
+                    os.rename(path, os.path.join(failed_dir, os.path.basename(path)))
+                    failed += 1
+                except Exception:
+                    return sent, failed, len(entries) - i
+                else:
+                    os.remove(path)
+                    sent += 1
+            return sent, failed, 0
+
+        if not queues:
+            return 0, 0, 0
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queues)))) as executor:
+            results = list(executor.map(deliver, queues.keys(), queues.values()))
+
+    return tuple(sum(counts) for counts in zip(*results))
+
+
+def deduplicate(url, data, window, state_file=None):
+    # identical messages (same url, channel, text and attachments) sent within
+    # window seconds of the first one are suppressed. Once the window is over
+    # a single summary tells how many were dropped. The state is shared by
+    # every process through a locked file.
+    # Returns the (url, data) pairs that should actually be sent.
+    import fcntl
+    import hashlib
+    import json
+
+    key = hashlib.sha1(json.dumps(
+        [url, data.get('channel'), data.get('text'), data.get('attachments')],
+        sort_keys=True).encode('utf-8')).hexdigest()
+
+    with open(dedup_path(state_file), 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        state = load_dedup_state(f)
+
+        now = time.time()
+        payloads = pop_expired(state, now)
+
+        if key in state:
+            state[key]['count'] += 1
+        else:
+            summary = {k: v for k, v in data.items() if k not in ('text', 'attachments')}
+            summary['text'] = (data.get('text') or '').strip().split('\n', 1)[0][:200]
+            state[key] = {'first': now, 'window': window, 'count': 0, 'url': url, 'data': summary}
+            payloads.append((url, data))
+
+        f.seek(0)
+        f.truncate()
+        json.dump(state, f)
+
+    return payloads
+
+
+def flush_dedup(state_file=None):
+    # deduplicate() only sends the summaries of finished windows when it is
+    # called again: --drain flushes them so they go out when a storm stops.
+    # Returns the (url, data) pairs of the summaries to send.
+    import fcntl
+    import json
+
+    with open(dedup_path(state_file), 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        state = load_dedup_state(f)
+        payloads = pop_expired(state, time.time())
+        if payloads:
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+    return payloads
+
+
+def dedup_path(state_file=None):
+    if state_file is None:
+        state_file = dedup_state
+    state_file = os.path.expanduser(state_file)
+    directory = os.path.dirname(state_file)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    return state_file
+
+
+def load_dedup_state(f):
+    import json
+
+    f.seek(0)
+    try:
+        return json.loads(f.read() or '{}')
+    except ValueError:
+        return {}
+
+
+def pop_expired(state, now):
+    payloads = []
+    for entry_key, entry in list(state.items()):
+        if now - entry['first'] < entry['window']:
+            continue
+        del state[entry_key]
+        if entry['count']:
+            payloads.append((entry['url'], dedup_summary(entry)))
+    return payloads
+
+
+def dedup_summary(entry):
+    data = dict(entry['data'])
+    window = entry['window']
+    if window >= 3600:
+        duration = "{:g}h".format(round(window / 3600.0, 1))
+    elif window >= 60:
+        duration = "{:g}m".format(round(window / 60.0, 1))
+    else:
+        duration = "{:g}s".format(window)
+
+    text = "repeated {} times in {}".format(entry['count'], duration)
+    if data.get('text'):
+        text = "> {}\n\n{}".format(data['text'], text)
+    data['text'] = text
+    return data
+
+
+def fanout(targets, max_workers=None, submit=None):
+    # targets are (label, url, data) or (label, url, data, submit)
+    from concurrent.futures import ThreadPoolExecutor
+
+    if max_workers is None:
+        max_workers = fanout_workers
+    if submit is None:
+        submit = post
+
+    def deliver(target):
+        label, url, data = target[:3]
+        try:
+            (target[3] if len(target) > 3 else submit)(url, data)
+        except Exception as e:
+            return label, e
+        return label, None
+
+    targets = list(targets)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets) or 1))) as executor:
+        return list(executor.map(deliver, targets))
+
+
+def read_channels(filename):
+    channels = []
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                channels.append(line)
+    return channels
+
+
+def config_paths(config_name='mattersend', config_file=None):
+    if config_file:
+        return (config_file,)
+    elif config_name:
+        return ("/etc/{}.conf".format(config_name), os.path.expanduser("~/.{}.conf".format(config_name)))
+    return ()
+
+
+def load_config(paths, section='DEFAULT'):
+    try:
+        return load_config_sections(paths)[section]
+    except KeyError:
+        import configparser
+        raise configparser.NoSectionError(section)
+
+
+def load_config_sections(paths):
+    # parsed files are cached and only re-read when one of them changes
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        except OSError:
+            signature.append(None)
+    signature = tuple(signature)
+
+    cached = _config_cache.get(paths)
+    if cached is None or cached[0] != signature:
+        import configparser
+
+        config = configparser.ConfigParser()
+        config.read(paths)
+
+        # file order, section globs match in it
+        sections = OrderedDict([('DEFAULT', dict(config.items('DEFAULT')))])
+        for name in config.sections():
+            sections[name] = dict(config.items(name))
+
+        cached = _config_cache[paths] = (signature, sections)
+
+    return cached[1]
+
+
+def match_sections(paths, patterns):
+    # section names and globs, matched in the order given and each section
+    # once. Globs never match DEFAULT.
+    import fnmatch
+
+    if isinstance(patterns, str):
+        patterns = [patterns]
+
+    sections = load_config_sections(paths)
+    matched = []
+    for pattern in patterns:
+        if is_section_glob(pattern):
+            names = [name for name in sections if name != 'DEFAULT' and fnmatch.fnmatchcase(name, pattern)]
+        else:
+            names = [pattern] if pattern in sections else []
+        if not names:
+            import configparser
+            raise configparser.NoSectionError(pattern)
+        matched += [name for name in names if name not in matched]
+    return matched
+
+
+def is_section_glob(section):
+    return any(c in section for c in '*?[')
+
+
+def read_text(f, limit=None, mode='head'):
+    # reads at most limit bytes from the head and/or the tail of a binary
+    # stream in constant memory, whatever its size. Invalid bytes are
+    # replaced and a marker tells how many bytes were skipped.
+    # Returns the text and the number of omitted bytes.
+    with Timer('read') as timer:
+        if limit is None:
+            head, tail, omitted = f.read(), b'', 0
+        else:
+            head, tail, omitted = read_bounded(f, limit, mode)
+        timer.nbytes = len(head) + len(tail)
+
+    return bounded_text(head, tail, omitted, mode), omitted
+
+
+def bounded_text(head, tail, omitted, mode='head'):
+    # decodes what read_bounded() kept, with the truncation marker
+    text = decode_text(head, final=not omitted)
+    if omitted:
+        if mode == 'head':
+            text += truncation_marker(omitted)
+        else:
+            text = "{}{}{}".format(text, truncation_marker(omitted), decode_text(tail, partial_start=True))
+    return text
+
+
+def read_bounded(f, limit, mode='head'):
+    if mode == 'head':
+        head_size = limit
+    elif mode == 'both':
+        head_size = limit // 2
+    elif mode == 'tail':
+        head_size = 0
+    else:
+        raise ValueError("Unknown truncation mode {!r}".format(mode))
+    tail_size = limit - head_size
+
+    try:
+        seekable = f.seekable()
+    except AttributeError:
+        seekable = False
+
+    if seekable:
+        start = f.tell()
+        end = f.seek(0, os.SEEK_END)
+        f.seek(start)
+        if end - start <= limit:
+            return f.read(), b'', 0
+
+        head = f.read(head_size)
+        f.seek(end - tail_size)
+        return head, f.read(tail_size), end - start - limit
+
+    # pipes: keep the head and a sliding window of the last chunks
+    from collections import deque
+
+    head = f.read(head_size) if head_size else b''
+    chunks = deque()
+    buffered = 0
+    omitted = 0
+    while True:
+        chunk = f.read(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        buffered += len(chunk)
+        while chunks and buffered - len(chunks[0]) >= tail_size:
+            dropped = chunks.popleft()
+            buffered -= len(dropped)
+            omitted += len(dropped)
+
+    tail = b''.join(chunks)
+    if len(tail) > tail_size:
+        omitted += len(tail) - tail_size
+        tail = tail[len(tail) - tail_size:]
+
+    return head, tail, omitted
+
+
+def decode_text(data, final=True, partial_start=False):
+    import codecs
+
+    if partial_start:
+        # skip the continuation bytes of a character cut in half
+        skip = 0
+        while skip < min(3, len(data)) and 0x80 <= data[skip] < 0xC0:
+            skip += 1
+        data = data[skip:]
+
+    decoder = codecs.getincrementaldecoder('utf-8')('replace')
+    text = decoder.decode(data, final)
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def truncation_marker(omitted):
+    return "\n[... {} bytes omitted ...]\n".format(omitted)
+
+
+def split_truncation(text):
+    # text read by read_text() in head mode without the truncation marker
+    # and the partial line before it, and the number of omitted bytes
+    if not text.endswith(' bytes omitted ...]\n'):
+        return text, 0
+
+    import re
+
+    tail = text[-100:]
+    match = re.search(r'\n\[\.\.\. (\d+) bytes omitted \.\.\.\]\n\Z', tail)
+    if match is None:
+        return text, 0
+    match_start = len(text) - len(tail) + match.start()
+    text = text[:match_start]
+    return text[:text.rfind('\n') + 1], int(match.group(1))
+
+
+def guess_mime(filename):
+    import mimetypes
+    return mimetypes.guess_type(filename)[0]
+
+
+def csv_table(text, dialect='sniff', limit=None, align=False, sniff_key=None):
+    # truncated input keeps its complete rows and its marker after the
+    # table, the rows left out are only counted when all of them are here
+    import csv
+
+    text, omitted = split_truncation(text)
+    if dialect == 'sniff':
+        dialect = sniff_dialect(text, sniff_key)['dialect']
+
+    # the stripped bounds, without copying the text
+    start, end = 0, len(text)
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+
+    def lines():
+        # only the rows actually rendered are sliced out of the text
+        position = start
+        while position < end:
+            stop = text.find('\n', position, end)
+            stop = end if stop < 0 else stop + 1
+            yield text[position:stop]
+            position = stop
+
+    def remaining(consumed):
+        # one row per line: cheap on text already in memory, but blind to
+        # quoted newlines
+        return text.count('\n', start, end) + 1 - consumed
+
+    with Timer('table'):
+        table = "\n".join(iter_md_table(csv.reader(lines(), dialect), limit, align,
+                                         remaining=None if omitted else remaining))
+    if omitted:
+        table += truncation_marker(omitted)
+    return table
+
+
+def sniff_dialect(text, key=None, header=False):
+    # only the first sniff_sample characters are looked at, and results are
+    # cached by key (e.g. a file path and mtime) so that repeated reports
+    # from the same source skip sniffing entirely
+    import csv
+
+    sniffed = None
+    if key is not None:
+        with _cache_lock:
+            sniffed = _dialect_cache.get(key)
+            if sniffed is not None:
+                _dialect_cache.move_to_end(key)
+    sample = None
+
+    if sniffed is None:
+        sample = sniff_text_sample(text)
+        with Timer('sniff', len(sample)):
+            sniffed = {'dialect': csv.Sniffer().sniff(sample), 'has_header': None}
+        if key is not None:
+            with _cache_lock:
+                _dialect_cache[key] = sniffed
+                while len(_dialect_cache) > dialect_cache_size:
+                    _dialect_cache.popitem(last=False)
+
+    if header and sniffed['has_header'] is None:
+        if sample is None:
+            sample = sniff_text_sample(text)
+        try:
+            with Timer('sniff', len(sample)):
+                sniffed['has_header'] = csv.Sniffer().has_header(sample)
+        except csv.Error:
+            sniffed['has_header'] = False
+
+    return sniffed
+
+
+def sniff_text_sample(text):
+    if len(text) <= sniff_sample:
+        return text
+    sample = text[:sniff_sample]
+    # do not feed a partial row to the sniffer
+    return sample[:sample.rfind('\n') + 1] or sample
+
+
+def file_sniff_key(filename):
+    st = os.stat(filename)
+    return ('file', os.path.realpath(filename), st.st_size, st.st_mtime_ns)
+
+
+class DistinctSketch:
+    # k minimum values sketch: keeps the k smallest 64-bit hashes seen, which
+    # estimates the number of distinct values in constant memory and can be
+    # merged across chunks
+    k = 256
+
+    def __init__(self, hash=None):
+        # hash is a hashlib constructor, its first 8 bytes are used. The
+        # lookups are bound once here, add() runs for every cell
+        import hashlib
+        import heapq
+
+        self.hash = hashlib.sha1 if hash is None else hash
+        self.heappush = heapq.heappush
+        self.heapreplace = heapq.heapreplace
+        self.heap = []
+        self.hashes = set()
+
+    def add(self, value):
+        h = int.from_bytes(self.hash(value.encode('utf-8', 'replace')).digest()[:8], 'big')
+        if h in self.hashes:
+            return
+        if len(self.heap) < self.k:
+            self.heappush(self.heap, -h)
+            self.hashes.add(h)
+        elif h < -self.heap[0]:
+            self.hashes.discard(-self.heapreplace(self.heap, -h))
+            self.hashes.add(h)
+
+    def merge(self, other):
+        import heapq
+
+        smallest = heapq.nsmallest(self.k, self.hashes | other.hashes)
+        self.hashes = set(smallest)
+        self.heap = [-h for h in smallest]
+        heapq.heapify(self.heap)
+
+    def estimate(self):
+        if len(self.heap) < self.k:
+            return len(self.heap)
+        return int((self.k - 1) * 2 ** 64 / -self.heap[0])
+
+
+class ColumnStats:
+    nulls_values = frozenset(['', 'null', 'none', 'na', 'n/a', 'nan'])
+
+    def __init__(self):
+        self.count = 0
+        self.nulls = 0
+        self.numbers = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.distinct = DistinctSketch()
+
+    def add(self, value):
+        self.count += 1
+        value = value.strip()
+        if value.lower() in self.nulls_values:
+            self.nulls += 1
+            return
+
+        self.distinct.add(value)
+        try:
+            number = float(value)
+        except ValueError:
+            return
+        self.numbers += 1
+        self.total += number
+        if self.min is None or number < self.min:
+            self.min = number
+        if self.max is None or number > self.max:
+            self.max = number
+
+    def merge(self, other):
+        self.count += other.count
+        self.nulls += other.nulls
+        self.numbers += other.numbers
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        self.distinct.merge(other.distinct)
+
+    def numeric(self):
+        return self.numbers and self.numbers == self.count - self.nulls
+
+
+def summarize_rows(rows, columns=None):
+    if columns is None:
+        columns = []
+    nrows = 0
+    for row in rows:
+        nrows += 1
+        while len(columns) < len(row):
+            stats = ColumnStats()
+            # rows seen before this column existed had no value for it
+            stats.count = stats.nulls = nrows - 1
+            columns.append(stats)
+        for stats, value in zip(columns, row):
+            stats.add(value)
+        for stats in columns[len(row):]:
+            stats.add('')
+    return nrows, columns
+
+
+def summarize_chunk(filename, start, end, dialect, skip_header=False):
+    # rows starting in the byte range [start, end) of filename
+    import csv
+
+    def lines(f):
+        if start:
+            # the row across the boundary belongs to the previous chunk:
+            # skip up to the first line starting at or after start
+            f.seek(start - 1)
+            f.readline()
+        else:
+            f.seek(0)
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8', 'replace')
+
+    with open(filename, 'rb') as f:
+        rows = csv.reader(lines(f), **dialect)
+        if skip_header:
+            next(rows, None)
+        return summarize_rows(rows)
+
+
+def csv_summary(stream=None, filename=None, dialect='sniff', jobs=1, limit=None):
+    # one pass over the whole input in bounded memory. Files can be split in
+    # jobs chunks processed in parallel, provided no quoted field spans lines.
+    import csv
+    from itertools import chain
+
+    if filename is not None:
+        with open(filename, 'r', newline='', encoding='utf-8', errors='replace') as f:
+            sample = f.read(sniff_sample)
+        key = file_sniff_key(filename)
+    else:
+        sample = stream.read(sniff_sample)
+        sample += stream.readline()
+        key = None
+
+    if dialect == 'sniff':
+        sniffed = sniff_dialect(sample, key, header=True)
+        dialect, has_header = sniffed['dialect'], sniffed['has_header']
+    else:
+        try:
+            has_header = csv.Sniffer().has_header(sniff_text_sample(sample))
+        except csv.Error:
+            has_header = False
+
+    if isinstance(dialect, str):
+        dialect = csv.get_dialect(dialect)
+    # sniffed dialects are local classes, pass plain parameters to the workers
+    params = {k: getattr(dialect, k) for k in ('delimiter', 'quotechar', 'escapechar', 'doublequote',
+                                               'skipinitialspace', 'quoting', 'lineterminator')}
+
+    with Timer('summary'):
+        names = None
+        if filename is not None and jobs > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            size = os.path.getsize(filename)
+            bounds = [size * i // jobs for i in range(jobs + 1)]
+            skip_header = [has_header] + [False] * (jobs - 1)
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                chunks = list(executor.map(summarize_chunk, [filename] * jobs, bounds[:-1],
+                                           bounds[1:], [params] * jobs, skip_header))
+
+            nrows, columns = 0, []
+            for chunk_rows, chunk_columns in chunks:
+                for i, stats in enumerate(chunk_columns):
+                    if i >= len(columns):
+                        columns.append(ColumnStats())
+                        columns[i].count = columns[i].nulls = nrows
+                    columns[i].merge(stats)
+                for stats in columns[len(chunk_columns):]:
+                    stats.count += chunk_rows
+                    stats.nulls += chunk_rows
+                nrows += chunk_rows
+
+            if has_header:
+                names = next(csv.reader(StringIO(sample), **params), None)
+        else:
+            if filename is not None:
+                stream = open(filename, 'r', newline='', encoding='utf-8', errors='replace')
+                lines = stream
+            else:
+                lines = chain(StringIO(sample), stream)
+
+            try:
+                rows = csv.reader(lines, **params)
+                if has_header:
+                    names = next(rows, None)
+                nrows, columns = summarize_rows(rows)
+            finally:
+                if filename is not None:
+                    stream.close()
+
+    return md_summary(nrows, columns, names, limit)
+
+
+def md_summary(nrows, columns, names=None, limit=None):
+    def number(value):
+        return '' if value is None else '{:.6g}'.format(value)
+
+    table = [['column', 'count', 'nulls', 'distinct', 'min', 'max', 'mean']]
+    for i, stats in enumerate(columns):
+        name = names[i] if names and i < len(names) else 'column {}'.format(i + 1)
+        row = [name, stats.count, stats.nulls, '~{}'.format(stats.distinct.estimate())]
+        if stats.numeric():
+            row += [number(stats.min), number(stats.max), number(stats.total / stats.numbers)]
+        else:
+            row += ['', '', '']
+        table.append(row)
+
+    title = "{} rows, {} columns\n\n".format(nrows, len(columns))
+    return title + md_table(table, None if limit is None else limit - len(title))
+
+
+def md_table(data, limit=None, align=False, sample=100):
+    return "\n".join(iter_md_table(data, limit, align, sample))
+
+
+def iter_md_table(data, limit=None, align=False, sample=100, remaining=None):
+    # renders rows lazily and stops consuming them once limit characters
+    # have been produced. remaining(consumed) tells how many rows were left
+    # out, or None when unknown: by default only sized data is counted. With
+    # align the column widths come from the first sample rows.
+    from itertools import chain, islice
+
+    if remaining is None and hasattr(data, '__len__'):
+        def remaining(consumed):
+            return len(data) - consumed
+
+    rows = iter(data)
+    widths = None
+    if align:
+        head = [[str(cell).translate(md_table_escape) for cell in row] for row in islice(rows, sample)]
+        widths = {}
+        for row in head:
+            for i, cell in enumerate(row):
+                widths[i] = min(max(widths.get(i, 3), len(cell)), md_table_max_width)
+        rows = chain(head, rows)
+
+    length = 0
+    for i, row in enumerate(rows):
+        cells = [str(cell).translate(md_table_escape) for cell in row]
+        if widths:
+            cells = [cell.ljust(widths.get(j, 0)) for j, cell in enumerate(cells)]
+        line = "| {} |".format(" | ".join(cells))
+
         if i == 1:
-            md.append("| --- " * len(row) + "|")
-        md.append("| {} |".format(" | ".join(
-            [str(cell).replace("|", "❘").replace("\n", " ").replace("\r", " ") for cell in row]
-        )))
-    return "\n".join(md)
+            if widths:
+                separator = "| {} |".format(" | ".join("-" * max(3, len(cell)) for cell in cells))
+            else:
+                separator = "| --- " * len(row) + "|"
+            line = separator + "\n" + line
+
+        # keep room for the footer
+        length += len(line) + 1
+        if limit is not None and i > 1 and length > limit - 40:
+            count = remaining(i) if remaining is not None else None
+            yield "\n+{} more rows".format(count) if count else "\n+more rows"
+            return
+
+        yield line
 
 
 class Message:
     def __init__(self, channel=None, url=None, username=None, icon=None,
                  config_section='DEFAULT', config_name='mattersend',
-                 config_file=None):
+                 config_file=None, session=None, spool=None, dedup=None, emoji=None):
         # CONFIG file
-        config = configparser.ConfigParser()
-
-        if config_file:
-            config.read(config_file)
-        elif config_name:
-            config.read(["/etc/{}.conf".format(config_name), os.path.expanduser("~/.{}.conf".format(config_name))])
-
-        config = dict(config.items(config_section))
+        with Timer('config'):
+            config = load_config(config_paths(config_name, config_file), config_section)
 
         # merge config file with cli arguments
         self.url = config.get('url') if url is None else url
         self.channel = config.get('channel') if channel is None else channel
         self.username = config.get('username') if username is None else username
         self.icon = config.get('icon') if icon is None else icon
+        self.session = session
+        self.spool = config.get('spool') if spool is None else spool
+        self.dedup = float(config.get('dedup', 0)) if dedup is None else dedup
+        self.dedup_state = config.get('dedup_state')
+        if emoji is None:
+            emoji = config.get('emoji', '').lower() in ('1', 'yes', 'true', 'on')
+        self.emoji = emoji
 
         self.text = ''
         self.attachments = []
 
     def get_payload(self):
+        import json
+        with Timer('serialize') as timer:
+            payload = json.dumps(self.get_data(), sort_keys=True, indent=4)
+            timer.nbytes = len(payload)
+        return payload
+
+    def get_data(self):
         payload = {}
 
         for opt in ('text', 'channel', 'username'):
@@ -1055,7 +1610,14 @@ class Message:
         if self.attachments:
             payload['attachments'] = [a.data() for a in self.attachments]
 
-        return json.dumps(payload, sort_keys=True, indent=4)
+        if self.emoji:
+            if payload.get('text'):
+                payload['text'] = expand_emoji(payload['text'])
+            for attachment in payload.get('attachments', ()):
+                if attachment.get('title'):
+                    attachment['title'] = expand_emoji(attachment['title'])
+
+        return payload
 
     def get_icon(self):
         if self.icon is None:
@@ -1066,7 +1628,7 @@ class Message:
 
         # workaround mattermost missing icon_emoji until implemented
         if ioptname == 'icon_emoji' and ioptvalue[0] == ':' and ioptvalue[-1] == ':':
-            ioptvalue = emoji_to_code.get(ioptvalue[1:-1], False)
+            ioptvalue = get_emoji_map().get(ioptvalue[1:-1], False)
             if ioptvalue:
                 baseurl = self.url.split('/hooks/', 1)
                 if len(baseurl) == 2:
@@ -1080,64 +1642,128 @@ class Message:
             self.text += separator
         self.text += text
 
-    def attach_file(self, filename, text=None, tabular=False, syntax='auto', fileinfo=False):
-        attachment = Attachment()
+    def attach_file(self, filename, text=None, tabular=False, syntax='auto', fileinfo=False,
+                    truncate='head', align=False):
+        attachment = file_attachment(filename, text, tabular, syntax, fileinfo, truncate, align)
+        self.attachments.append(attachment)
+        return attachment
 
-        if tabular:
-            syntax = None
+    def attach_summary(self, filename, dialect='sniff', jobs=1, fileinfo=False):
+        attachment = summary_attachment(filename, dialect, jobs, fileinfo)
+        self.attachments.append(attachment)
+        return attachment
 
-        (mime, _) = mimetypes.guess_type(filename)
-        attachment.title = os.path.basename(filename)
+    def attach_files(self, filenames, tabular=False, syntax='auto', fileinfo=False,
+                     truncate='head', align=False, max_workers=None, processes=None,
+                     summary=False, summary_jobs=1):
+        # files are read and rendered concurrently and attached in the given
+        # order. Tables can be rendered in a process pool instead of threads.
+        filenames = list(filenames)
+        if summary:
+            render, args = summary_attachment, (tabular or 'sniff', summary_jobs, fileinfo)
+        else:
+            render, args = file_attachment, (None, tabular, syntax, fileinfo, truncate, align)
+
+        if len(filenames) == 1:
+            attachments = [render(filenames[0], *args)]
+        else:
+            from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+            if processes and tabular and not summary:
+                executor = ProcessPoolExecutor(max_workers=processes)
+            else:
+                executor = ThreadPoolExecutor(max_workers=max_workers or fanout_workers)
+            with executor:
+                attachments = list(executor.map(render, filenames, *[[arg] * len(filenames) for arg in args]))
 
-        if text is None:
-            with open(filename, 'rUb') as f:
-                text = f.read().decode('utf-8')
+        self.attachments += attachments
+        return attachments
 
-        if tabular:
-            csvfile = StringIO(text.strip())
+    def split(self, limit=None):
+        # one post per part, parts are numbered and keep their order
+        if limit is None:
+            limit = text_limit
 
-            if tabular == 'sniff':
-                dialect = csv.Sniffer().sniff(text)
-            else:
-                dialect = tabular
+        import copy
 
-            text = md_table(csv.reader(csvfile, dialect))
+        def part(text):
+            message = copy.copy(self)
+            message.text = text
+            message.attachments = []
+            return message
 
-        elif syntax == 'auto':
-            syntax = detect_syntax(attachment.title, mime)
+        texts = [self.text]
+        if len(self.text) > limit:
+            texts = split_text(self.text, limit - 12)
+            texts = ["{}\n({}/{})".format(text, i + 1, len(texts)) for i, text in enumerate(texts)]
 
-        if syntax is not None:
-            text = md_code(text, syntax)
+        messages = [part(text) for text in texts]
+        for attachment in self.attachments:
+            for attachment_part in attachment.split(limit):
+                if messages[-1].attachments:
+                    messages.append(part(''))
+                messages[-1].attachments.append(attachment_part)
 
-        attachment.text = text
+        return messages
 
-        if fileinfo:
-            statinfo = os.stat(filename)
-            attachment.add_field('Size', sizeof_fmt(statinfo.st_size), True)
-            attachment.add_field('Mime', mime, True)
+    def validate(self):
+        if self.url is None:
+            raise TypeError('Missing mattermost webhook URL')
 
-        self.attachments.append(attachment)
-        return attachment
+        if self.channel is None:
+            raise TypeError('Missing destination channel')
 
     def send(self):
+        self.validate()
+        return self.submit(self.url, self.get_data())
+
+    def submit(self, url, data):
+        if url is None:
+            raise TypeError('Missing mattermost webhook URL')
+
+        payloads = [(url, data)]
+        if self.dedup:
+            payloads = deduplicate(url, data, self.dedup, self.dedup_state)
+
+        r = None
+        for url, data in payloads:
+            if self.spool:
+                r = spool_payload(self.spool, url, data)
+            else:
+                r = post(url, data, self.session)
+        return r
+
+    def send_to(self, channels, max_workers=None):
         if self.url is None:
             raise TypeError('Missing mattermost webhook URL')
 
-        if self.channel is None:
-            raise TypeError('Missing destination channel')
+        data = self.get_data()
+        targets = []
+        for channel in channels:
+            targets.append((channel, self.url, dict(data, channel=channel.strip())))
 
-        import requests
+        return fanout(targets, max_workers, self.submit)
 
-        payload = self.get_payload()
-        r = requests.post(self.url, data={'payload': payload})
+    async def send_async(self, session=None):
+        # same dedup and spool handling as submit(), their file locks and
+        # writes run in the default executor
+        self.validate()
 
-        if r.status_code != 200:
-            try:
-                r = json.loads(r.text)
-            except ValueError:
-                r = {'message': r.text, 'status_code': r.status_code}
-            raise RuntimeError("{} ({})".format(r['message'], r['status_code']))
+        import asyncio
+        loop = asyncio.get_event_loop()
 
+        data = self.get_data()
+        payloads = [(self.url, data)]
+        if self.dedup:
+            payloads = await loop.run_in_executor(None, deduplicate, self.url, data,
+                                                  self.dedup, self.dedup_state)
+
+        r = None
+        for url, data in payloads:
+            if self.spool:
+                r = await loop.run_in_executor(None, spool_payload, self.spool, url, data)
+            else:
+                r = await post_async(url, data, session)
         return r
 
 
@@ -1182,11 +1808,160 @@ class Attachment:
         data = {k: v for (k, v) in self.__dict__.items() if v}
         if not self.fallback:
             data['fallback'] = self.text
-        # 4000+ chars triggers error on mattermost, not sure where the limit is
-        data['text'] = data['text'][:3500]
-        data['fallback'] = data['fallback'][:3500]
+        data['text'] = data['text'][:text_limit]
+        data['fallback'] = data['fallback'][:text_limit]
         return data
 
+    def split(self, limit=None):
+        if limit is None:
+            limit = text_limit
+
+        if len(self.text) <= limit and len(self.fallback or '') <= limit:
+            return [self]
+
+        import copy
+
+        texts = split_text(self.text, limit)
+        parts = []
+        for i, text in enumerate(texts):
+            part = copy.copy(self)
+            part.text = text
+            part.fallback = None
+            if self.title:
+                part.title = "{} ({}/{})".format(self.title, i + 1, len(texts))
+            if i:
+                part.pretext = None
+                part.fields = []
+            parts.append(part)
+
+        # a custom fallback describes the whole attachment
+        parts[0].fallback = self.fallback
+        return parts
+
+
+def file_attachment(filename, text=None, tabular=False, syntax='auto', fileinfo=False,
+                    truncate='head', align=False):
+    attachment = Attachment()
+
+    if tabular:
+        syntax = None
+
+    # the system mime databases are only read when the mime is displayed
+    mime = guess_mime(filename) if fileinfo else None
+    attachment.title = os.path.basename(filename)
+
+    omitted = 0
+    read_file = text is None
+    if read_file:
+        with open(filename, 'rb') as f:
+            if tabular and truncate:
+                truncate = 'head'
+            text, omitted = read_text(f, read_limit if truncate else None, truncate)
+
+    if tabular:
+        sniff_key = file_sniff_key(filename) if read_file else None
+        text = csv_table(text, tabular, text_limit if truncate else None, align, sniff_key)
+        omitted = 0
+
+    elif syntax == 'auto':
+        head = text
+        if omitted and truncate != 'head':
+            # the text starts with the tail of the file
+            with open(filename, 'rb') as f:
+                head = decode_text(f.read(syntax_sniff_size), final=False)
+        syntax = detect_syntax(attachment.title, mime, head[:syntax_sniff_size])
+
+    if syntax is not None:
+        text = md_code(text, syntax)
+
+    attachment.text = text
+
+    if fileinfo:
+        statinfo = os.stat(filename)
+        attachment.add_field('Size', sizeof_fmt(statinfo.st_size), True)
+        attachment.add_field('Mime', mime, True)
+
+    return attachment
+
+
+def summary_attachment(filename, dialect='sniff', jobs=1, fileinfo=False):
+    attachment = Attachment()
+    attachment.title = os.path.basename(filename)
+    attachment.text = csv_summary(filename=filename, dialect=dialect, jobs=jobs, limit=text_limit)
+
+    if fileinfo:
+        statinfo = os.stat(filename)
+        attachment.add_field('Size', sizeof_fmt(statinfo.st_size), True)
+
+    return attachment
+
+
+def expand_files(patterns):
+    # globs match recursively with **, directories stand for the files they
+    # contain. Hidden files are only included when named explicitly.
+    import glob
+
+    filenames = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                filenames += [os.path.join(root, f) for f in sorted(files) if not f.startswith('.')]
+        elif glob.has_magic(pattern):
+            filenames += sorted(f for f in glob.glob(pattern, recursive=True) if os.path.isfile(f))
+        else:
+            filenames.append(pattern)
+    return filenames
+
+
+def split_text(text, limit=None):
+    # split on line boundaries, closing and reopening code fences so that
+    # every part renders on its own
+    if limit is None:
+        limit = text_limit
+
+    parts = []
+    part = []
+    length = 0
+    fence = None
+    fence_close = '\n```'
+
+    for line in text.splitlines(True):
+        reopen = fence or ''
+        reserved = len(fence_close) if fence else 0
+
+        # lines that cannot fit in a part of their own are cut
+        room = max(1, limit - len(reopen) - reserved)
+        for i in range(0, len(line), room):
+            piece = line[i:i + room]
+            if length > len(reopen) and length + len(piece) + reserved > limit:
+                parts.append(close_fence(part, fence))
+                part = [reopen]
+                length = len(reopen)
+            part.append(piece)
+            length += len(piece)
+
+        stripped = line.rstrip('\n')
+        if fence is not None:
+            if stripped.endswith('```'):
+                fence = None
+        elif stripped.lstrip().startswith('```') and '```' not in stripped.lstrip()[3:]:
+            fence = stripped.lstrip() + '\n'
+
+    if part:
+        parts.append(close_fence(part, fence))
+
+    return parts or ['']
+
+
+def close_fence(lines, fence):
+    text = ''.join(lines)
+    if fence is not None:
+        if not text.endswith('\n'):
+            text += '\n'
+        text += '```'
+    return text
+
 
 def md_code(code, syntax='plain'):
     if syntax == 'plain':
@@ -1194,24 +1969,33 @@ def md_code(code, syntax='plain'):
     return "```{}\n{}```".format(syntax, code)
 
 
-def main():
-    try:
-        import setproctitle
-        setproctitle.setproctitle(name)
-    except ImportError:
-        pass
+def build_parser(parser_class=None):
+    import argparse
+
+    if parser_class is None:
+        parser_class = argparse.ArgumentParser
 
-    dialects = csv.list_dialects()
-    dialects.sort()
-    dialects.insert(0, 'sniff')
+    # csv.list_dialects() of a fresh interpreter, without importing csv
+    dialects = ['sniff', 'excel', 'excel-tab', 'unix']
 
     # CLI arguments
-    parser = argparse.ArgumentParser(prog=name, description=description)
+    parser = parser_class(prog=name, description=description)
 
     parser.add_argument('-V', '--version',  action='version', version="%(prog)s " + version)
     parser.add_argument('-C', '--config',   help='Use a different configuration file')
-    parser.add_argument('-s', '--section',  help='Configuration file section', default='DEFAULT')
-    parser.add_argument('-c', '--channel',  help='Send to this channel or @username')
+    parser.add_argument('-s', '--section',  action='append',
+                        help='Configuration file section or section glob, the message is sent with '
+                             'the options of each one (can be repeated, DEFAULT: DEFAULT)')
+    parser.add_argument('-c', '--channel',  action='append',
+                        help='Send to this channel or @username (can be repeated)')
+    parser.add_argument('--channel-file',   metavar='FILE',
+                        help='Also send to every channel listed in FILE (one per line)')
+    parser.add_argument('-j', '--jobs',     type=int, default=fanout_workers,
+                        help='Maximum concurrent requests when sending to several channels (DEFAULT: %(default)s)')
+    parser.add_argument('--transport',      choices=sorted(transports),
+                        help='HTTP client library (DEFAULT: {})'.format(transport))
+    parser.add_argument('--timeout',        metavar='SECONDS', type=float,
+                        help='Connection and read timeout (DEFAULT: {})'.format(http_timeout))
     parser.add_argument('-U', '--url',      help='Mattermost webhook URL')
     parser.add_argument('-u', '--username', help='Username')
     parser.add_argument('-i', '--icon',     help='Icon')
@@ -1221,58 +2005,525 @@ def main():
                        nargs='?', choices=dialects,
                        help='Parse input as CSV and format it as a table (DIALECT can be one of %(choices)s)')
     group.add_argument('-y', '--syntax', default='auto')
-
+    parser.add_argument('-a', '--align', action='store_true',
+                        help='Pad table columns to the width of their first rows')
+    parser.add_argument('--tabular-summary', action='store_true',
+                        help='Read the whole CSV input and send per column statistics instead of a table')
+    parser.add_argument('--summary-jobs', metavar='N', type=int, default=1,
+                        help='Summarize large files in N parallel chunks, assumes no quoted '
+                             'field spans lines (DEFAULT: %(default)s)')
+
+    parser.add_argument('-e', '--emoji', action='store_const', const=True,
+                        help='Replace :emoji: shortcodes in the text and attachment titles with '
+                             'unicode characters (DEFAULT: the emoji config option)')
     parser.add_argument('-I', '--info', action='store_true',
                         help='Include file information in message')
     parser.add_argument('-n', '--dry-run', '--just-print', action='store_true',
                         help="Don't send, just print the payload")
-    parser.add_argument('-f', '--file', default='-',
-                        help="Read content from FILE. If - reads from standard input (DEFAULT: %(default)s)")
+    parser.add_argument('--timings', action='store_true',
+                        help='Print the time spent in each phase to standard error')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Write cProfile statistics of the whole invocation to FILE')
+    parser.add_argument('--split', action='store_true',
+                        help='Split content longer than {} characters into several numbered posts '
+                             'instead of truncating it'.format(text_limit))
+    parser.add_argument('--truncate', choices=['head', 'tail', 'both'], default='head',
+                        help='Part of long content to keep, only about {} bytes are read '
+                             '(DEFAULT: %(default)s)'.format(read_limit))
+    parser.add_argument('-f', '--file', action='append',
+                        help="Read content from FILE, a glob or a directory, one attachment per file "
+                             "(can be repeated). If - reads from standard input (DEFAULT: -)")
+    parser.add_argument('--file-jobs', metavar='N', type=int, default=fanout_workers,
+                        help='Files read and rendered at the same time (DEFAULT: %(default)s)')
+    parser.add_argument('--render-processes', metavar='N', type=int,
+                        help='Render tables of several files in N processes instead of threads')
+
+    group = parser.add_argument_group('follow')
+    group.add_argument('--follow', action='store_true',
+                       help='Keep reading the input as a stream and send it in batches')
+    group.add_argument('--flush-interval', metavar='SECONDS', type=float, default=5.0,
+                       help='Send a batch at most SECONDS after its first line (DEFAULT: %(default)s)')
+    group.add_argument('--flush-size', metavar='CHARS', type=int, default=3500,
+                       help='Send a batch as soon as it reaches CHARS characters (DEFAULT: %(default)s)')
+    group.add_argument('--queue-size', metavar='LINES', type=int, default=10000,
+                       help='Lines buffered while a batch is being sent (DEFAULT: %(default)s)')
+    group.add_argument('--drop', choices=['oldest', 'newest'], default='oldest',
+                       help='Lines dropped when the buffer is full (DEFAULT: %(default)s)')
+
+    parser.add_argument('--dedup', metavar='SECONDS', type=float,
+                        help='Drop messages identical to one sent less than SECONDS ago and '
+                             'send a single summary afterwards (DEFAULT: the dedup config option)')
+
+    group = parser.add_argument_group('spool')
+    group.add_argument('--spool', metavar='DIR',
+                       help='Queue messages in DIR instead of sending them (DEFAULT: the spool config option)')
+    group.add_argument('--drain', action='store_true',
+                       help='Deliver the messages queued in the spool directory and the pending '
+                            'dedup summaries, then exit')
+
+    group = parser.add_argument_group('relay')
+    group.add_argument('--serve', action='store_true',
+                       help='Run a resident relay listening on the unix socket. '
+                            'Clients use it when ${} is set'.format(relay_socket_env))
+    group.add_argument('--socket', metavar='PATH',
+                       help='Relay socket path (DEFAULT: ${} or {})'.format(relay_socket_env, relay_socket_default))
+
+    return parser
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # hand everything over to a running relay before doing any real work
+    socket_path = os.environ.get(relay_socket_env)
+    local = ('--serve', '--follow', '--timings', '--profile')
+    if socket_path and not any(arg.split('=', 1)[0] in local for arg in argv):
+        status = relay(socket_path, argv)
+        if status is not None:
+            sys.exit(status)
 
-    args = parser.parse_args()
+    try:
+        import setproctitle
+        setproctitle.setproctitle(name)
+    except ImportError:
+        pass
 
-    if args.file == '-':
-        message = sys.stdin.read()
-        filename = None
-    else:
-        message = ''
-        filename = args.file
+    args = build_parser().parse_args(argv)
 
+    if args.serve:
+        serve(args.socket or socket_path or os.path.expanduser(relay_socket_default))
+        return
 
+    timings = add_timing_hook(Timings()) if args.timings else None
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        status = execute(args, sys.stdin, sys.stdout, sys.stderr)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if timings is not None:
+            remove_timing_hook(timings)
+            sys.stderr.write(timings.report())
+
+    sys.exit(status)
+
+
+def execute(args, stdin, stdout, stderr, stdin_text=None):
+    # stdin_text is standard input already read and truncated by a relay client.
+    # --transport and --timeout get a session of their own: in the relay the
+    # shared session and module defaults serve every other client
+    session = None
+    if args.transport or args.timeout:
+        session = create_session(backend=args.transport, timeout=args.timeout)
     try:
-        payload = send(args.channel, message, filename, args.url,
-                       args.username, args.icon, args.syntax, args.tabular,
-                       args.info, args.dry_run, args.section, name,
-                       args.config)
-    except (configparser.Error, TypeError, RuntimeError) as e:
-        sys.exit(str(e))
+        return run_cli(args, stdin, stdout, stderr, stdin_text, session)
+    finally:
+        if session is not None:
+            session.close()
 
-    if args.dry_run:
-        print(payload)
 
+def run_cli(args, stdin, stdout, stderr, stdin_text=None, session=None):
+    import configparser
 
-def send(channel, message='', filename=False, url=None, username=None,
-         icon=None, syntax='auto', tabular=False, fileinfo=False,
-         just_return=False, config_section='DEFAULT',
-         config_name='mattersend', config_file=None):
+    channels = args.channel or []
+    sections = args.section or ['DEFAULT']
+    section = sections[0] if len(sections) == 1 else sections
+
+    def deliver(message, filename, tabular=args.tabular, summary=args.tabular_summary):
+        try:
+            payload = send(channels if len(channels) > 1 else (channels or [None])[0],
+                           message, filename, args.url,
+                           args.username, args.icon, args.syntax, tabular,
+                           args.info, args.dry_run, section, name,
+                           args.config, args.jobs, args.split, args.truncate,
+                           args.spool, args.dedup, args.align, summary, args.summary_jobs,
+                           args.file_jobs, args.render_processes, args.emoji, session)
+        except (configparser.Error, TypeError, RuntimeError, IOError) as e:
+            stderr.write("{}\n".format(e))
+            return 1
+
+        if args.dry_run:
+            stdout.write("{}\n".format(payload))
+        elif payload is not None:
+            failed = 0
+            for channel, error in payload:
+                if error is None:
+                    stderr.write("{}: ok\n".format(channel))
+                else:
+                    failed += 1
+                    stderr.write("{}: {}\n".format(channel, error))
+            if failed:
+                stderr.write("{} of {} targets failed\n".format(failed, len(payload)))
+                return 1
+
+        return 0
+
+    if args.drain:
+        try:
+            paths = config_paths(name, args.config)
+            spools = [args.spool] if args.spool else []
+            states = []
+            for section in match_sections(paths, sections):
+                options = load_config(paths, section)
+                spool = options.get('spool')
+                if not args.spool and spool and spool not in spools:
+                    spools.append(spool)
+                state = os.path.expanduser(options.get('dedup_state') or dedup_state)
+                if state not in states and os.path.exists(state):
+                    states.append(state)
+            if not spools and not states:
+                raise TypeError('Missing spool directory')
+
+            sent = failed = kept = 0
+            for spool in spools:
+                counts = drain(spool, args.jobs, session)
+                sent, failed, kept = sent + counts[0], failed + counts[1], kept + counts[2]
+
+            # summaries of the dedup windows that ended since the last message
+            for state in states:
+                for url, data in flush_dedup(state):
+                    try:
+                        post(url, data, session)
+                        sent += 1
+                    except (RuntimeError, IOError):
+                        failed += 1
+        except (configparser.Error, TypeError, RuntimeError, IOError) as e:
+            stderr.write("{}\n".format(e))
+            return 1
+
+        stderr.write("{} sent, {} failed, {} kept for retry\n".format(sent, failed, kept))
+        return 1 if failed or kept else 0
+
+    try:
+        if args.channel_file:
+            channels += read_channels(args.channel_file)
+    except IOError as e:
+        stderr.write("{}\n".format(e))
+        return 1
+
+    files = ['-'] if args.file is None else expand_files(args.file)
+    if not files:
+        stderr.write("No files match {}\n".format(' '.join(args.file)))
+        return 1
+    if len(files) > 1 and ('-' in files or args.follow):
+        stderr.write("Standard input and --follow take a single file\n")
+        return 1
+
+    if args.follow:
+        status = [0]
+
+        def flush(message, dropped):
+            if dropped:
+                message += "\n[{} lines dropped]".format(dropped)
+            status[0] |= deliver(message, None)
+            stdout.flush()
+
+        if files == ['-']:
+            follow(stdin, flush, args.flush_interval, args.flush_size,
+                   args.queue_size, args.drop)
+        else:
+            with open(files[0], 'r') as f:
+                follow(f, flush, args.flush_interval, args.flush_size,
+                       args.queue_size, args.drop)
+        return status[0]
+
+    if files == ['-']:
+        if stdin_text is not None:
+            if not args.tabular_summary and not args.split:
+                return deliver(stdin_text, None)
+            stdin = StringIO(stdin_text)
+        if args.tabular_summary:
+            # streamed, the whole input is never held in memory
+            message = csv_summary(stdin, dialect=args.tabular or 'sniff', limit=text_limit)
+            return deliver(message, None, tabular=False, summary=False)
+        if args.split:
+            return deliver(stdin.read(), None)
+        if args.tabular:
+            args.truncate = 'head'
+        stdin = getattr(stdin, 'buffer', stdin)
+        message, omitted = read_text(stdin, read_limit, args.truncate)
+        return deliver(message, None)
+
+    return deliver('', files)
+
+
+def follow(stream, flush, interval=5.0, size=3500, queue_size=10000, drop='oldest'):
+    # a reader thread keeps draining the stream while flush() is sending;
+    # when the queue is full lines are dropped according to the drop policy
+    import queue
+
+    lines = queue.Queue(queue_size)
+    lock = threading.Lock()
+    dropped = [0]
+    eof = object()
+
+    def reader():
+        for line in iter(lambda: stream.readline(size), ''):
+            try:
+                lines.put_nowait(line)
+            except queue.Full:
+                with lock:
+                    dropped[0] += 1
+                if drop == 'oldest':
+                    try:
+                        lines.get_nowait()
+                    except queue.Empty:
+                        pass
+                    lines.put_nowait(line)
+        lines.put(eof)
+
+    thread = threading.Thread(target=reader, name='mattersend-follow')
+    thread.daemon = True
+    thread.start()
+
+    def emit(batch):
+        with lock:
+            ndropped, dropped[0] = dropped[0], 0
+        if batch or ndropped:
+            flush(''.join(batch), ndropped)
+
+    batch = []
+    length = 0
+    deadline = None
+
+    while True:
+        timeout = None if deadline is None else max(0, deadline - time.time())
+        try:
+            line = lines.get(timeout=timeout)
+        except queue.Empty:
+            line = None
+
+        if line is eof:
+            emit(batch)
+            break
+
+        if line is not None:
+            if batch and length + len(line) > size:
+                emit(batch)
+                batch, length, deadline = [], 0, None
+
+            batch.append(line)
+            length += len(line)
+            if deadline is None:
+                deadline = time.time() + interval
+            if length < size:
+                continue
+
+        emit(batch)
+        batch, length, deadline = [], 0, None
+
+
+def relay(socket_path, argv):
+    import json
+    import socket
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except (IOError, OSError):
+        client.close()
+        return None
+
+    with client:
+        # standard input is truncated here as a direct invocation would,
+        # only --split and --tabular-summary stream all of it
+        request = {'argv': argv, 'cwd': os.getcwd()}
+        stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+        mode = relay_stdin_mode(argv)
+        if mode not in (None, 'stream'):
+            head, tail, omitted = read_bounded(stdin, read_limit, mode)
+            request['stdin'] = {'mode': mode, 'head': len(head), 'size': len(head) + len(tail),
+                                'omitted': omitted}
+        client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+        if mode == 'stream':
+            while True:
+                chunk = stdin.read(65536)
+                if not chunk:
+                    break
+                client.sendall(chunk)
+        elif mode is not None:
+            client.sendall(head + tail)
+        client.shutdown(socket.SHUT_WR)
+
+        response = client.makefile('rb').read()
+
+    response = json.loads(response.decode('utf-8'))
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    return response['status']
+
+
+def relay_reads_stdin(argv):
+    # mirror the CLI: stdin is only consumed when no input file is given
+    # and no spool is being drained
+    filenames = []
+    for i, arg in enumerate(argv):
+        if arg in ('-h', '--help', '-V', '--version', '--drain'):
+            return False
+        if arg in ('-f', '--file') and i + 1 < len(argv):
+            filenames.append(argv[i + 1])
+        elif arg.startswith('--file='):
+            filenames.append(arg[len('--file='):])
+        elif arg.startswith('-f') and not arg.startswith('--'):
+            filenames.append(arg[2:])
+    return not filenames or filenames == ['-']
+
+
+def relay_stdin_mode(argv):
+    # None when stdin is not read, 'stream' when all of it is needed,
+    # otherwise the truncation mode of read_bounded()
+    if not relay_reads_stdin(argv):
+        return None
+
+    mode = 'head'
+    for i, arg in enumerate(argv):
+        if arg in ('--split', '--tabular-summary'):
+            return 'stream'
+        if arg == '--truncate' and i + 1 < len(argv):
+            mode = argv[i + 1]
+        elif arg.startswith('--truncate='):
+            mode = arg[len('--truncate='):]
+    if any(arg == '-t' or arg.split('=', 1)[0] == '--tabular' for arg in argv):
+        mode = 'head'
+    return mode if mode in ('head', 'tail', 'both') else None
+
+
+def relay_execute(argv, cwd, stdin, bounded=None):
+    # stdin is a binary stream or bytes, bounded describes the head and
+    # tail kept by the client in relay_stdin_mode()
+    import argparse
+
+    class RelayExit(Exception):
+        pass
+
+    class RelayArgumentParser(argparse.ArgumentParser):
+        def _print_message(self, message, file=None):
+            if message:
+                output.append(message)
+
+        def exit(self, status=0, message=None):
+            if message:
+                output.append(message)
+            raise RelayExit(status)
+
+    output = []
+    stdout = StringIO()
+    stderr = StringIO()
+
+    try:
+        args = build_parser(RelayArgumentParser).parse_args(argv)
+    except RelayExit as e:
+        status = e.args[0]
+        if status:
+            return status, '', ''.join(output)
+        return status, ''.join(output), ''
+
+    if args.serve:
+        return 2, '', 'Cannot start a relay from a relay client\n'
+
+    # relative paths are the client's
+    for option in ('config', 'channel_file', 'spool'):
+        path = getattr(args, option)
+        if path:
+            setattr(args, option, os.path.join(cwd, os.path.expanduser(path)))
+    if args.file:
+        args.file = [path if path == '-' else os.path.join(cwd, os.path.expanduser(path)) for path in args.file]
+
+    import io
+    stdin_text = None
+    if bounded is not None:
+        stdin_text = bounded_text(stdin[:bounded['head']], stdin[bounded['head']:],
+                                  bounded['omitted'], bounded['mode'])
+        stdin = b''
+    if isinstance(stdin, bytes):
+        stdin = io.BytesIO(stdin)
+    stdin = io.TextIOWrapper(stdin, 'utf-8', 'replace')
+
+    status = execute(args, stdin, stdout, stderr, stdin_text)
+    return status, stdout.getvalue(), stderr.getvalue()
+
+
+def serve(socket_path):
+    import json
+    import socketserver
+
+    class RelayHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            # never more than read_limit bytes unless the options stream stdin
+            bounded = request.get('stdin')
+            if bounded is None:
+                stdin = self.rfile
+            else:
+                stdin = self.rfile.read(min(bounded['size'], read_limit))
+
+            try:
+                status, stdout, stderr = relay_execute(request['argv'], request['cwd'], stdin, bounded)
+            except Exception as e:
+                status, stdout, stderr = 1, '', '{}\n'.format(e)
+
+            response = {'status': status, 'stdout': stdout, 'stderr': stderr}
+            self.wfile.write(json.dumps(response).encode('utf-8'))
+
+    class RelayServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    umask = os.umask(0o077)
+    try:
+        server = RelayServer(socket_path, RelayHandler)
+    finally:
+        os.umask(umask)
+
+    import signal
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+
+def build_message(channel, message='', filename=False, url=None,
+                  username=None, icon=None, syntax='auto', tabular=False,
+                  fileinfo=False, config_section='DEFAULT',
+                  config_name='mattersend', config_file=None,
+                  truncate='head', spool=None, dedup=None, align=False,
+                  summary=False, summary_jobs=1, file_workers=None,
+                  render_processes=None, emoji=None, session=None):
     msg = Message(channel, url, username, icon, config_section,
-                  config_name, config_file)
+                  config_name, config_file, session, spool=spool, dedup=dedup, emoji=emoji)
 
-    if filename:
+    # one attachment per file
+    filenames = [filename] if isinstance(filename, str) else list(filename or ())
+
+    if filenames:
         if syntax == 'none':
             syntax = None
-        msg.attach_file(filename, None, tabular, syntax, fileinfo)
+        msg.attach_files(filenames, tabular, syntax, fileinfo, truncate, align,
+                         file_workers, render_processes, summary, summary_jobs)
     else:
-        if tabular:
+        if summary:
             syntax = None
-            csvfile = StringIO(message.strip())
+            message = csv_summary(StringIO(message), dialect=tabular or 'sniff', limit=text_limit)
 
-            if tabular == 'sniff':
-                dialect = csv.Sniffer().sniff(message)
-            else:
-                dialect = tabular
-
-            message = md_table(csv.reader(csvfile, dialect))
+        elif tabular:
+            syntax = None
+            sniff_key = ('section', config_paths(config_name, config_file), config_section)
+            message = csv_table(message, tabular, text_limit if truncate else None, align, sniff_key)
 
         elif syntax in ('auto', 'none'):
             syntax = None
@@ -1281,12 +2532,100 @@ def send(channel, message='', filename=False, url=None, username=None,
             message = md_code(message, syntax)
 
     msg.text = message
+    return msg
 
-    if just_return:
-        payload = msg.get_payload()
-        return "POST {}\n{}".format(msg.url, payload)
 
-    msg.send()
+def send(channel, message='', filename=False, url=None, username=None,
+         icon=None, syntax='auto', tabular=False, fileinfo=False,
+         just_return=False, config_section='DEFAULT',
+         config_name='mattersend', config_file=None,
+         max_workers=None, split=False, truncate='head', spool=None,
+         dedup=None, align=False, summary=False, summary_jobs=1,
+         file_workers=None, render_processes=None, emoji=None, session=None):
+    channels = None
+    if isinstance(channel, (list, tuple)):
+        channels, channel = channel, None
+
+    # several sections or a section glob: rendered once with the options of
+    # the first section, then addressed to each of them
+    sections = None
+    if not isinstance(config_section, str) or is_section_glob(config_section):
+        sections = match_sections(config_paths(config_name, config_file), config_section)
+        config_section = sections[0]
+
+    # split messages need the whole content
+    msg = build_message(channel, message, filename, url, username, icon,
+                        syntax, tabular, fileinfo, config_section,
+                        config_name, config_file,
+                        None if split else truncate, spool, dedup, align,
+                        summary, summary_jobs, file_workers, render_processes, emoji,
+                        session)
+    messages = msg.split() if split else [msg]
+
+    if sections is not None:
+        options = dict(channel=channel, url=url, username=username, icon=icon,
+                       config_name=config_name, config_file=config_file,
+                       session=session, spool=spool, dedup=dedup, emoji=emoji)
+        payloads = []
+        results = []
+        for msg in messages:
+            targets = section_targets(msg, sections, channels, **options)
+            if just_return:
+                for label, target, data in targets:
+                    target.channel = data.get('channel')
+                    payloads.append("POST {}\n{}".format(target.url, target.get_payload()))
+            else:
+                results += fanout([(label, target.url, data, target.submit)
+                                   for label, target, data in targets], max_workers)
+        return "\n".join(payloads) if just_return else results
+
+    if just_return:
+        payloads = []
+        for msg in messages:
+            for channel in channels or [msg.channel]:
+                msg.channel = channel
+                payloads.append("POST {}\n{}".format(msg.url, msg.get_payload()))
+        return "\n".join(payloads)
+
+    # parts go out one after the other over the same pooled connection
+    if channels is not None:
+        results = []
+        for msg in messages:
+            results += msg.send_to(channels, max_workers)
+        return results
+
+    for msg in messages:
+        msg.send()
+
+
+def section_targets(msg, sections, channels=None, **options):
+    # the content rendered once in msg, with the url, channel, username and
+    # icon of every section. Returns (label, message, data) tuples. Raises
+    # before anything is sent when a section has no url or channel.
+    targets = []
+    for section in sections:
+        target = Message(config_section=section, **options)
+        target.text = msg.text
+        target.attachments = msg.attachments
+
+        data = target.get_data()
+        if not channels:
+            target.validate()
+            targets.append((section, target, data))
+            continue
+        for channel in channels:
+            targets.append(("{}/{}".format(section, channel), target, dict(data, channel=channel.strip())))
+    return targets
+
+
+async def send_async(channel, message='', filename=False, url=None,
+                     username=None, icon=None, syntax='auto', tabular=False,
+                     fileinfo=False, config_section='DEFAULT',
+                     config_name='mattersend', config_file=None):
+    msg = build_message(channel, message, filename, url, username, icon,
+                        syntax, tabular, fileinfo, config_section,
+                        config_name, config_file)
+    await msg.send_async()
 
 
 if __name__ == '__main__':
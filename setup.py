@@ -9,13 +9,18 @@ README = os.path.realpath(os.path.sep.join([__file__, os.path.pardir, 'README.rs
 
 setup(
     name=mattersend.name,
-    py_modules=['mattersend'],
+    py_modules=['mattersend', 'mattersend_emoji'],
     entry_points={
         'console_scripts': [
             'mattersend=mattersend:main',
         ],
     },
-    install_requires=["setproctitle", "requests"],
+    install_requires=["setproctitle"],
+    extras_require={
+        'async': ["aiohttp"],
+        'requests': ["requests"],
+        'fast': ["orjson"],
+    },
     tests_require=["nose", "coverage", "pyfakefs"],
     test_suite="nose.collector",
     version=mattersend.version,
@@ -27,8 +32,7 @@ setup(
     download_url="{}/tarball/v{}".format(mattersend.url, mattersend.version),
     classifiers=[
         "Programming Language :: Python",
-        "Programming Language :: Python :: 2.7",
-        "Programming Language :: Python :: 3.4",
+        "Programming Language :: Python :: 3.5",
         "License :: OSI Approved :: MIT License",
         "Intended Audience :: System Administrators",
         "Operating System :: POSIX :: Linux",
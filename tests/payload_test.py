@@ -1,5 +1,15 @@
+import os
 import re
+import csv
+import io
+import json
+import configparser
+import asyncio
+import threading
 import mattersend
+
+from io import BytesIO, StringIO
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from pyfakefs import fake_filesystem_unittest
 
 try:
@@ -16,10 +26,76 @@ def normalize_payload(payload):
 
 
 class MockResponse:
-    def __init__(self, url, data):
+    def __init__(self, url, data, headers=None):
         self.text = 'test'
+        self.headers = {}
+        self.status_code = 200
         if url.endswith('/fail'):
-            self.status_code = 502
+            self.status_code = 500
+        elif json.loads(data.decode('utf-8')).get('channel') == 'broken':
+            self.status_code = 404
+
+
+class MockThrottledResponse(MockResponse):
+    responses = []
+
+    def __init__(self, url, data, headers=None):
+        MockResponse.__init__(self, url, data, headers)
+        self.status_code, self.headers = self.responses.pop(0)
+
+
+class MockClock:
+    now = 1000.0
+
+    @classmethod
+    def sleep(cls, seconds):
+        cls.now += seconds
+
+
+class MockAsyncResponse:
+    def __init__(self, url, data, headers=None):
+        self.headers = {}
+        self.status = 500 if url.endswith('/fail') else 200
+
+    async def text(self):
+        return 'test'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+class MockAsyncSession:
+    def post(self, url, data, headers=None):
+        return MockAsyncResponse(url, data, headers)
+
+
+async def mock_async_session():
+    return MockAsyncSession()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        WebhookHandler.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-Ratelimit-Limit', '10')
+        self.end_headers()
+        self.wfile.write(body)
+        # drop the kept-alive connection without telling the client
+        self.close_connection = self.path.endswith('/drop')
+
+    def log_message(self, format, *args):
+        pass
 
 
 class PayloadTest(fake_filesystem_unittest.TestCase):
@@ -230,13 +306,13 @@ username = AngryBot''')
     "text": ""
 }""")
 
-    @mock.patch('requests.post', side_effect=MockResponse)
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse)
     def test_send(self, mock_post):
         payload = mattersend.send(channel='town-square',
                                   message='test message',
                                   url='http://chat.net/hooks/abdegh12')
 
-    @mock.patch('requests.post', side_effect=MockResponse)
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse)
     def test_send(self, mock_post):
         with self.assertRaises(RuntimeError):
             payload = mattersend.send(channel='town-square',
@@ -259,3 +335,568 @@ username = AngryBot''')
     ],
     "text": "test_message"
 }""")
+
+    def test_shared_session(self):
+        first = mattersend.Message()
+        second = mattersend.Message()
+        self.assertIs(mattersend.get_session(), mattersend.get_session())
+
+        with mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse) as mock_post:
+            for message in (first, second):
+                message.channel = 'town-square'
+                message.url = 'http://chat.net/hooks/fail'
+                with self.assertRaises(RuntimeError):
+                    message.send()
+        self.assertEqual(mock_post.call_count, 2)
+
+    def test_http_client_session(self):
+        server = HTTPServer(('127.0.0.1', 0), WebhookHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        url = 'http://127.0.0.1:{}/hooks/'.format(server.server_address[1])
+
+        session = mattersend.HTTPClientSession(timeout=5)
+        try:
+            WebhookHandler.connections = 0
+            for i in range(3):
+                r = session.post(url + 'abc', data='{"text":"ok"}', headers=mattersend.json_headers)
+                self.assertEqual((r.status_code, r.text), (200, '{"text":"ok"}'))
+            self.assertEqual(r.headers.get('x-ratelimit-limit'), '10')
+            self.assertEqual(WebhookHandler.connections, 1)
+
+            # stale keep-alive connections are replaced transparently
+            session.post(url + 'drop', data=b'{}')
+            self.assertEqual(session.post(url + 'abc', data=b'{}').status_code, 200)
+            self.assertEqual(WebhookHandler.connections, 2)
+
+            with self.assertRaises(IOError):
+                session.post('chat.net/hooks/abc', data=b'{}')
+        finally:
+            session.close()
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    @mock.patch('mattersend.get_async_session', side_effect=mock_async_session)
+    def test_send_async(self, mock_session):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(mattersend.send_async(
+                channel='town-square', message='test message',
+                url='http://chat.net/hooks/abdegh12'))
+
+            with self.assertRaises(RuntimeError):
+                loop.run_until_complete(mattersend.send_async(
+                    channel='town-square', message='test message',
+                    url='http://chat.net/hooks/fail'))
+        finally:
+            loop.close()
+        self.assertEqual(mock_session.call_count, 2)
+
+    @mock.patch('mattersend.get_async_session', side_effect=mock_async_session)
+    def test_send_async_spool(self, mock_session):
+        msg = mattersend.build_message('town-square', 'test message', url='http://chat.net/hooks/abdegh12')
+        msg.spool = '/var/spool/mattersend'
+        msg.dedup = 300
+        msg.dedup_state = '/home/test/dedup.json'
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(msg.send_async())
+            loop.run_until_complete(msg.send_async())
+        finally:
+            loop.close()
+        self.assertFalse(mock_session.called)
+        self.assertEqual(len([e for e in os.listdir(msg.spool) if e.endswith('.json')]), 1)
+
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse)
+    def test_send_many_channels(self, mock_post):
+        results = mattersend.send(channel=['town-square', 'broken', '@me'],
+                                  message='test message',
+                                  url='http://chat.net/hooks/abdegh12')
+
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual([channel for channel, _ in results],
+                         ['town-square', 'broken', '@me'])
+        self.assertIsNone(results[0][1])
+        self.assertIsInstance(results[1][1], RuntimeError)
+        self.assertIsNone(results[2][1])
+
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse)
+    def test_send_many_sections(self, mock_post):
+        self.fs.CreateFile('/home/test/servers.conf', contents='''[DEFAULT]
+channel = town-square
+
+[prod-eu]
+url = https://eu.mydomain.com/hooks/eu
+
+[prod-us]
+url = https://us.mydomain.com/hooks/us/fail
+
+[staging]
+url = https://staging.mydomain.com/hooks/st
+username = StagingBot''')
+
+        with mock.patch('mattersend.md_code', side_effect=mattersend.md_code) as mock_render:
+            results = mattersend.send(channel=None, message='deploy done', syntax='plain',
+                                      config_section=['staging', 'prod-*'],
+                                      config_file='/home/test/servers.conf')
+        self.assertEqual(mock_render.call_count, 1)
+
+        self.assertEqual([label for label, _ in results], ['staging', 'prod-eu', 'prod-us'])
+        self.assertIsNone(results[0][1])
+        self.assertIsNone(results[1][1])
+        self.assertIsInstance(results[2][1], RuntimeError)
+
+        posts = {call[0][0]: json.loads(call[1]['data'].decode('utf-8')) for call in mock_post.call_args_list}
+        self.assertEqual(posts['https://staging.mydomain.com/hooks/st']['username'], 'StagingBot')
+        self.assertEqual(posts['https://eu.mydomain.com/hooks/eu']['channel'], 'town-square')
+        self.assertNotIn('username', posts['https://eu.mydomain.com/hooks/eu'])
+
+        with self.assertRaises(configparser.NoSectionError):
+            mattersend.send(channel=None, message='x', config_section='dev-*',
+                            config_file='/home/test/servers.conf')
+
+        # like a single section, nothing is posted without a channel
+        self.fs.CreateFile('/home/test/nochannel.conf', contents='''[a]
+url = https://a.mydomain.com/hooks/a
+
+[b]
+url = https://b.mydomain.com/hooks/b''')
+        mock_post.reset_mock()
+        with self.assertRaisesRegex(TypeError, 'Missing destination channel'):
+            mattersend.send(channel=None, message='hi', config_section=['a', 'b'],
+                            config_file='/home/test/nochannel.conf')
+        self.assertFalse(mock_post.called)
+
+    def test_dry_run_many_channels(self):
+        payload = mattersend.send(channel=['town-square', 'off-topic'],
+                                  message='test message',
+                                  just_return=True)
+
+        self.assertEqual(normalize_payload(payload),
+                         r"""POST https://chat.mydomain.com/hooks/abcdefghi123456
+{
+    "channel": "town-square",
+    "text": "test message"
+}
+POST https://chat.mydomain.com/hooks/abcdefghi123456
+{
+    "channel": "off-topic",
+    "text": "test message"
+}""")
+
+    def test_relay_execute(self):
+        status, stdout, stderr = mattersend.relay_execute(
+            ['-c', 'town-square', '-n'], '/home/test', b'test message')
+
+        self.assertEqual(status, 0)
+        self.assertEqual(stderr, '')
+        self.assertEqual(normalize_payload(stdout),
+                         r"""POST https://chat.mydomain.com/hooks/abcdefghi123456
+{
+    "channel": "town-square",
+    "text": "test message"
+}""")
+
+        status, stdout, stderr = mattersend.relay_execute(
+            ['-c', 'town-square', '--spool', 'relspool'], '/home/test', b'test message')
+        self.assertEqual(status, 0)
+        self.assertEqual(len(os.listdir('/home/test/relspool')), 1)
+
+        status, stdout, stderr = mattersend.relay_execute(['--bogus'], '/home/test', b'')
+        self.assertEqual(status, 2)
+        self.assertIn('unrecognized arguments', stderr)
+
+    def test_relay_transport_options(self):
+        timeouts = []
+
+        def post(session, url, data=None, headers=None):
+            timeouts.append(session.timeout)
+            return MockResponse(url, data, headers)
+
+        default = mattersend.http_timeout
+        with mock.patch.object(mattersend.HTTPClientSession, 'post', autospec=True, side_effect=post):
+            status, stdout, stderr = mattersend.relay_execute(
+                ['-c', 'town-square', '--timeout', '1'], '/home/test', b'test message')
+            self.assertEqual(status, 0, stderr)
+            mattersend.send(channel='town-square', message='test message')
+
+        # the option only applied to its own invocation
+        self.assertEqual(timeouts, [1.0, default])
+        self.assertEqual(mattersend.http_timeout, default)
+
+    def test_relay_reads_stdin(self):
+        self.assertTrue(mattersend.relay_reads_stdin(['-c', 'town-square']))
+        self.assertTrue(mattersend.relay_reads_stdin(['-f', '-']))
+        self.assertFalse(mattersend.relay_reads_stdin(['-f', 'todo.txt']))
+        self.assertFalse(mattersend.relay_reads_stdin(['--file=todo.txt']))
+        self.assertFalse(mattersend.relay_reads_stdin(['-f', '-', '-f', 'todo.txt']))
+        self.assertFalse(mattersend.relay_reads_stdin(['--version']))
+        self.assertFalse(mattersend.relay_reads_stdin(['--drain']))
+
+    def test_relay_bounded_stdin(self):
+        self.assertEqual(mattersend.relay_stdin_mode(['-c', 'town-square']), 'head')
+        self.assertEqual(mattersend.relay_stdin_mode(['--truncate', 'tail']), 'tail')
+        self.assertEqual(mattersend.relay_stdin_mode(['--truncate=both', '-t']), 'head')
+        self.assertEqual(mattersend.relay_stdin_mode(['--split']), 'stream')
+        self.assertIsNone(mattersend.relay_stdin_mode(['-f', 'todo.txt']))
+
+        head, tail, omitted = mattersend.read_bounded(BytesIO(b'a' * 10 + b'b' * 10), 8, 'both')
+        bounded = {'mode': 'both', 'head': len(head), 'size': len(head) + len(tail), 'omitted': omitted}
+        status, stdout, stderr = mattersend.relay_execute(
+            ['-c', 'town-square', '-n', '--truncate', 'both'], '/home/test', head + tail, bounded)
+        self.assertEqual(status, 0)
+        self.assertIn('aaaa', stdout)
+        self.assertIn('bbbb', stdout)
+        self.assertIn('12 bytes omitted', stdout)
+
+    def test_expand_emoji(self):
+        text = 'done :rocket: :trollface: :nope:\n```\n:rocket:\n```\n`:x:` :x:'
+        self.assertEqual(mattersend.expand_emoji(text),
+                         'done \U0001f680 :trollface: :nope:\n```\n:rocket:\n```\n`:x:` \u274c')
+        self.assertEqual(mattersend.expand_emoji(':jp: ```:jp:'), '\U0001f1ef\U0001f1f5 ```:jp:')
+        self.assertEqual(mattersend.expand_emoji('10:30:smile: :foo:smile:'), '10:30\U0001f604 :foo\U0001f604')
+        self.assertEqual(mattersend.expand_emoji(':smile:smile:'), '\U0001f604smile:')
+
+        message = mattersend.Message(emoji=True)
+        message.text = ':smile:'
+        message.attachments.append(mattersend.Attachment(':smile:'))
+        message.attachments[0].set_title('build :x:')
+        data = message.get_data()
+        self.assertEqual(data['text'], '\U0001f604')
+        self.assertEqual(data['attachments'][0]['title'], 'build \u274c')
+        self.assertEqual(data['attachments'][0]['text'], ':smile:')
+
+        message.emoji = False
+        self.assertEqual(message.get_data()['text'], ':smile:')
+
+    def test_detect_syntax(self):
+        self.assertEqual(mattersend.detect_syntax('foo.py.orig', None), 'python')
+        self.assertEqual(mattersend.detect_syntax('Makefile.in', None), 'makefile')
+        self.assertEqual(mattersend.detect_syntax('backup.sql.2', None), 'sql')
+        self.assertIsNone(mattersend.detect_syntax('app.log.1', None))
+        self.assertEqual(mattersend.detect_syntax('deploy', None, '#!/usr/bin/env python3\n'), 'python')
+        self.assertEqual(mattersend.detect_syntax('run', None, '#!/bin/sh -e\n'), 'bash')
+        self.assertEqual(mattersend.detect_syntax('rules', None, '# vim: set ft=ruby:\n'), 'ruby')
+        self.assertIsNone(mattersend.detect_syntax('notes', None, 'hello\n'))
+
+        with mock.patch('mattersend.syntax_from_name', return_value='go') as mock_detect:
+            mattersend.detect_syntax('cached.test', None)
+            mattersend.detect_syntax('cached.test', None)
+        self.assertEqual(mock_detect.call_count, 1)
+
+        with mock.patch('mattersend.syntax_cache_size', 2):
+            mattersend._syntax_cache.clear()
+            for name in ('a.py', 'b.py', 'a.py', 'c.py'):
+                mattersend.detect_syntax(name, None)
+            self.assertEqual(list(mattersend._syntax_cache), [('a.py', None), ('c.py', None)])
+
+        self.fs.CreateFile('/home/test/deploy', contents='#!/usr/bin/perl -w\nprint 1;\n')
+        msg = mattersend.build_message('town-square', filename='/home/test/deploy')
+        self.assertTrue(msg.attachments[0].text.startswith('```perl\n'))
+
+    def test_emoji_map(self):
+        emojis = mattersend.get_emoji_map()
+        self.assertEqual(emojis['angry'], '1f620')
+        self.assertEqual(emojis['trollface'], 'trollface')
+        self.assertEqual(mattersend.emoji_to_code['angry'], '1f620')
+        self.assertIn('trollface', mattersend.emoji_to_code)
+        self.assertEqual(dict(mattersend.emoji_to_code.items()), emojis)
+
+    def test_config_cache(self):
+        first = mattersend.Message(config_section='angrybot')
+        with mock.patch('configparser.ConfigParser.read') as mock_read:
+            second = mattersend.Message(config_section='angrybot')
+        self.assertFalse(mock_read.called)
+        self.assertEqual(second.username, first.username)
+
+        os.remove('/etc/mattersend.conf')
+        self.fs.CreateFile('/etc/mattersend.conf', contents='''[angrybot]
+username = CalmBot''')
+        self.assertEqual(mattersend.Message(config_section='angrybot').username, 'CalmBot')
+
+        with self.assertRaises(configparser.NoSectionError):
+            mattersend.Message(config_section='missing')
+
+    def test_follow(self):
+        batches = []
+        stream = StringIO(''.join('line {}\n'.format(i) for i in range(5)))
+        mattersend.follow(stream, lambda text, dropped: batches.append((text, dropped)),
+                          interval=60, size=14)
+
+        self.assertEqual(batches, [('line 0\nline 1\n', 0),
+                                   ('line 2\nline 3\n', 0),
+                                   ('line 4\n', 0)])
+
+    def test_split_text(self):
+        code = mattersend.md_code(''.join('line {}\n'.format(i) for i in range(30)), 'python')
+        parts = mattersend.split_text(code, 60)
+
+        self.assertGreater(len(parts), 1)
+        for part in parts:
+            self.assertLessEqual(len(part), 60)
+            self.assertTrue(part.startswith('```python\n'))
+            self.assertTrue(part.endswith('```'))
+        self.assertEqual(''.join(p[len('```python\n'):-3] for p in parts),
+                         code[len('```python\n'):-3])
+
+    def test_split_attachment(self):
+        message = mattersend.Message(channel='town-square')
+        message.text = 'report'
+        message.attach_file('/home/test/report.log', 'x\n' * 3000, syntax=None)
+        message.attach_file('/home/test/short.log', 'short', syntax=None)
+
+        parts = message.split()
+        self.assertEqual([len(m.attachments) for m in parts], [1, 1, 1])
+        self.assertEqual([m.text for m in parts], ['report', '', ''])
+        self.assertEqual([m.attachments[0].title for m in parts],
+                         ['report.log (1/2)', 'report.log (2/2)', 'short.log'])
+        self.assertEqual(''.join(m.attachments[0].text for m in parts[:2]), 'x\n' * 3000)
+
+    def test_bounded_read(self):
+        self.fs.CreateFile('/home/test/big.log',
+                           contents=''.join('line {}\n'.format(i) for i in range(100000)))
+        message = mattersend.Message()
+
+        head = message.attach_file('/home/test/big.log', syntax=None)
+        self.assertTrue(head.text.startswith('line 0\n'))
+        self.assertTrue(head.text.endswith(' bytes omitted ...]\n'))
+        self.assertLess(len(head.text), mattersend.read_limit + 100)
+
+        tail = message.attach_file('/home/test/big.log', syntax=None, truncate='tail')
+        self.assertTrue(tail.text.startswith('\n[... '))
+        self.assertTrue(tail.text.endswith('line 99999\n'))
+
+    def test_read_text_invalid_utf8(self):
+        text, omitted = mattersend.read_text(BytesIO(b'caf\xc3\xa9\r\nbad \xff\r\n'))
+        self.assertEqual(text, u'caf\xe9\nbad �\n')
+        self.assertEqual(omitted, 0)
+
+    @mock.patch('time.time', side_effect=lambda: MockClock.now)
+    @mock.patch('time.sleep', side_effect=MockClock.sleep)
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockThrottledResponse)
+    def test_retry_after(self, mock_post, mock_sleep, mock_time):
+        MockThrottledResponse.responses = [
+            (429, {'Retry-After': '2'}),
+            (503, {}),
+            (200, {'X-Ratelimit-Limit': '10', 'X-Ratelimit-Remaining': '9',
+                   'X-Ratelimit-Reset': '1'}),
+        ]
+        url = 'http://chat.net/hooks/throttled'
+        mattersend.send(channel='town-square', message='test message', url=url)
+
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertGreaterEqual(mock_sleep.call_args_list[0][0][0], 1.9)
+        self.assertEqual(mattersend.get_rate_limiter(url).rate, 9.0)
+
+    def test_rate_limiter(self):
+        limiter = mattersend.RateLimiter(rate=10, burst=2)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertAlmostEqual(limiter.reserve(), 0.1, places=2)
+
+        limiter.pause(5)
+        self.assertGreater(limiter.reserve(), 4.9)
+
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse)
+    def test_spool_and_drain(self, mock_post):
+        spool = '/var/spool/mattersend'
+        for channel, url in (('town-square', 'http://chat.net/hooks/abdegh12'),
+                             ('broken', 'http://chat.net/hooks/abdegh12'),
+                             ('town-square', 'http://chat.net/hooks/fail')):
+            mattersend.send(channel=channel, message='test message', url=url, spool=spool)
+        self.assertFalse(mock_post.called)
+        self.assertEqual(len([e for e in os.listdir(spool) if e.endswith('.json')]), 3)
+
+        self.assertEqual(mattersend.drain(spool), (1, 1, 1))
+        self.assertEqual(len([e for e in os.listdir(spool) if e.endswith('.json')]), 1)
+        self.assertEqual(len(os.listdir(os.path.join(spool, 'failed'))), 1)
+
+    @mock.patch('time.time', side_effect=lambda: MockClock.now)
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse)
+    def test_dedup(self, mock_post, mock_time):
+        for i in range(4):
+            mattersend.send(channel='town-square', message='disk full',
+                            url='http://chat.net/hooks/abdegh12', dedup=300)
+        self.assertEqual(mock_post.call_count, 1)
+
+        MockClock.sleep(301)
+        mattersend.send(channel='town-square', message='disk full',
+                        url='http://chat.net/hooks/abdegh12', dedup=300)
+
+        payloads = [json.loads(call[1]['data'].decode('utf-8')) for call in mock_post.call_args_list]
+        self.assertEqual(len(payloads), 3)
+        self.assertEqual(payloads[1]['text'], '> disk full\n\nrepeated 3 times in 5m')
+        self.assertEqual(payloads[2]['text'], 'disk full')
+
+    @mock.patch('time.time', side_effect=lambda: MockClock.now)
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse)
+    def test_dedup_flush(self, mock_post, mock_time):
+        for i in range(3):
+            mattersend.send(channel='town-square', message='disk full',
+                            url='http://chat.net/hooks/abdegh12', dedup=60)
+        self.assertEqual(mattersend.flush_dedup(), [])
+
+        # the storm is over, --drain sends the summary without a new message
+        MockClock.sleep(61)
+        stderr = StringIO()
+        args = mattersend.build_parser().parse_args(['--drain'])
+        self.assertEqual(mattersend.execute(args, StringIO(), StringIO(), stderr), 0)
+        self.assertEqual(stderr.getvalue(), '1 sent, 0 failed, 0 kept for retry\n')
+        self.assertEqual(json.loads(mock_post.call_args[1]['data'].decode('utf-8'))['text'],
+                         '> disk full\n\nrepeated 2 times in 1m')
+        self.assertEqual(mattersend.flush_dedup(), [])
+
+    def test_tabular_stdin_truncated(self):
+        # the partial last row and the marker never become table rows
+        data = ('name,value\n' + ''.join('row{},{}\n'.format(i, 'x' * 20) for i in range(3000))).encode('utf-8')
+        argv = ['-c', 'town-square', '-n', '-t']
+
+        stdout = StringIO()
+        args = mattersend.build_parser().parse_args(argv)
+        stdin = io.TextIOWrapper(BytesIO(data), 'utf-8')
+        self.assertEqual(mattersend.execute(args, stdin, stdout, StringIO()), 0)
+
+        head, tail, omitted = mattersend.read_bounded(BytesIO(data), mattersend.read_limit, 'head')
+        bounded = {'mode': 'head', 'head': len(head), 'size': len(head), 'omitted': omitted}
+        status, relayed, stderr = mattersend.relay_execute(argv, '/home/test', head, bounded)
+        self.assertEqual(relayed, stdout.getvalue())
+
+        text = json.loads(stdout.getvalue().split('\n', 1)[1])['text']
+        table, marker = text.rsplit('\n\n', 1)
+        self.assertEqual(marker, '+more rows\n[... {} bytes omitted ...]'.format(omitted))
+        for line in table.split('\n')[2:]:
+            self.assertRegex(line, r'^\| row\d+ \| x{20} \|$')
+
+    def test_md_table_limit(self):
+        rows = [['n', 'double']] + [[i, i * 2] for i in range(1000)]
+        table = mattersend.md_table(rows, limit=100)
+
+        self.assertLessEqual(len(table), 100)
+        self.assertTrue(table.startswith('| n | double |\n| --- | --- |\n| 0 | 0 |\n'))
+        self.assertTrue(table.endswith('\n\n+{} more rows'.format(1000 - table.count('\n') + 3)))
+
+        # iterators are not read past the limit just to count the rest
+        rows = iter(rows)
+        self.assertEqual(mattersend.md_table(rows, limit=100), table.rsplit('+', 1)[0] + '+more rows')
+        rendered = table.count('\n') - 3
+        self.assertEqual(next(rows), [rendered + 1, (rendered + 1) * 2])
+
+        text = 'n,double\n' + ''.join('{},{}\n'.format(i, i * 2) for i in range(1000))
+        self.assertEqual(mattersend.csv_table(text, 'excel', limit=100), table)
+
+    def test_md_table_align(self):
+        table = mattersend.md_table([['abc', 'def'], ['fo|o', 'bar\nbaz'], ['x', 'y']], align=True)
+        self.assertEqual(table, '| abc  | def     |\n'
+                                '| ---- | ------- |\n'
+                                '| fo❘o | bar baz |\n'
+                                '| x    | y       |')
+
+    def test_sniff_cache(self):
+        with mock.patch.object(csv.Sniffer, 'sniff', autospec=True,
+                               side_effect=csv.Sniffer.sniff) as mock_sniff:
+            for i in range(3):
+                mattersend.send(channel='town-square', filename='/home/test/source.csv',
+                                tabular='sniff', just_return=True)
+            self.assertEqual(mock_sniff.call_count, 1)
+
+            for i in range(3):
+                mattersend.send(channel='town-square', message='abc;def\nfoo;bar',
+                                tabular='sniff', config_section='angrybot', just_return=True)
+            self.assertEqual(mock_sniff.call_count, 2)
+
+    def test_sniff_sample(self):
+        text = 'abc;def\n' + 'foo;bar\n' * 100000
+        with mock.patch.object(csv.Sniffer, 'sniff', autospec=True,
+                               side_effect=csv.Sniffer.sniff) as mock_sniff:
+            self.assertEqual(mattersend.sniff_dialect(text)['dialect'].delimiter, ';')
+        sample = mock_sniff.call_args[0][1]
+        self.assertLessEqual(len(sample), mattersend.sniff_sample)
+        self.assertTrue(sample.endswith('foo;bar\n'))
+
+    @mock.patch('mattersend.dialect_cache_size', 2)
+    def test_dialect_cache_size(self):
+        mattersend._dialect_cache.clear()
+        for key in ('a', 'b', 'a', 'c'):
+            mattersend.sniff_dialect('abc;def\nfoo;bar\n', key)
+        self.assertEqual(list(mattersend._dialect_cache), ['a', 'c'])
+
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse)
+    def test_wire_encoding(self, mock_post):
+        mattersend.send(channel='town-square', message='caf\u00e9 \u2758 \U0001f600',
+                        url='http://chat.net/hooks/abdegh12')
+
+        body = mock_post.call_args[1]['data']
+        self.assertEqual(mock_post.call_args[1]['headers'], {'Content-Type': 'application/json'})
+        self.assertEqual(json.loads(body.decode('utf-8')),
+                         {'channel': 'town-square', 'text': 'caf\u00e9 \u2758 \U0001f600'})
+        self.assertNotIn(b'\\u', body)
+        self.assertNotIn(b' "', body)
+
+    @mock.patch('mattersend.HTTPClientSession.post', side_effect=MockResponse)
+    def test_timing_hooks(self, mock_post):
+        phases = []
+        hook = mattersend.add_timing_hook(lambda phase, seconds, nbytes: phases.append((phase, nbytes)))
+        try:
+            mattersend.send(channel='town-square', message='test message',
+                            url='http://chat.net/hooks/abdegh12')
+        finally:
+            mattersend.remove_timing_hook(hook)
+
+        body = mock_post.call_args[1]['data']
+        self.assertEqual([phase for phase, _ in phases], ['config', 'serialize', 'throttle', 'http'])
+        self.assertEqual(dict(phases)['http'], len(body))
+
+        timings = mattersend.Timings()
+        timings('http', 0.25, 2048)
+        timings('http', 0.25, 2048)
+        self.assertIn('http            2     500.00     4.0KiB', timings.report())
+
+    def test_multiple_files(self):
+        self.fs.CreateFile('/home/test/logs/b.log', contents='second')
+        self.fs.CreateFile('/home/test/logs/a.log', contents='first')
+        self.fs.CreateFile('/home/test/logs/.hidden', contents='hidden')
+        self.fs.CreateFile('/home/test/logs/nested/c.log', contents='third')
+
+        self.assertEqual(mattersend.expand_files(['/home/test/logs']),
+                         ['/home/test/logs/a.log', '/home/test/logs/b.log', '/home/test/logs/nested/c.log'])
+        self.assertEqual(mattersend.expand_files(['/home/test/*.c*', '/home/test/Makefile']),
+                         ['/home/test/source.coffee', '/home/test/source.csv', '/home/test/Makefile'])
+
+        msg = mattersend.build_message('town-square', filename=mattersend.expand_files(['/home/test/logs']),
+                                       syntax='none', file_workers=2)
+        self.assertEqual([(a.title, a.text) for a in msg.attachments],
+                         [('a.log', 'first'), ('b.log', 'second'), ('c.log', 'third')])
+
+    def test_tabular_summary(self):
+        text = 'name,score\n' + ''.join('n{},{}\n'.format(i % 3, '' if i % 4 == 0 else i)
+                                        for i in range(1, 101))
+        summary = mattersend.csv_summary(StringIO(text))
+        self.assertTrue(summary.startswith('100 rows, 2 columns\n\n'))
+        self.assertIn('| name | 100 | 0 | ~3 |  |  |  |', summary)
+        self.assertIn('| score | 100 | 25 | ~75 | 1 | 99 | 50 |', summary)
+
+        with open('/home/test/summary.csv', 'w') as f:
+            f.write(text)
+        payload = mattersend.send(channel='town-square', filename='/home/test/summary.csv',
+                                  summary=True, just_return=True)
+        self.assertIn('"title": "summary.csv"', payload)
+        self.assertIn('100 rows, 2 columns', payload)
+
+        # chunks summarized in parallel add up to the same statistics
+        from concurrent.futures import ThreadPoolExecutor
+        with mock.patch('concurrent.futures.ProcessPoolExecutor', ThreadPoolExecutor):
+            chunked = mattersend.csv_summary(filename='/home/test/summary.csv', jobs=3)
+        self.assertEqual(chunked, summary)
+
+    def test_tabular_summary_line_boundaries(self):
+        # 100 rows of 10 bytes: the chunk boundaries fall on line starts
+        with open('/home/test/rows.csv', 'w') as f:
+            f.write(''.join('r{:03d},{:04d}\n'.format(i, i * 7) for i in range(100)))
+
+        from concurrent.futures import ThreadPoolExecutor
+        with mock.patch('concurrent.futures.ProcessPoolExecutor', ThreadPoolExecutor):
+            for jobs in (2, 4, 5, 10):
+                summary = mattersend.csv_summary(filename='/home/test/rows.csv', jobs=jobs)
+                self.assertTrue(summary.startswith('100 rows, 2 columns\n'), (jobs, summary))
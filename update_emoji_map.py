@@ -1,28 +1,57 @@
-import requests
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
 
-response = requests.get('https://raw.githubusercontent.com/mattermost/platform/master/webapp/utils/emoji.json').json()
+# Regenerates mattersend_emoji.py from mattermost's emoji.json.
+#
+#   python update_emoji_map.py              # download the upstream emoji.json
+#   python update_emoji_map.py emoji.json   # use a local copy (offline)
 
-with open('mattersend.py', 'r') as f:
-    mattersend_py = f.readlines()
+import sys
+import json
 
-updated_mattersend_py = []
+EMOJI_URL = 'https://raw.githubusercontent.com/mattermost/platform/master/webapp/utils/emoji.json'
+OUTPUT = 'mattersend_emoji.py'
 
-in_block = False
-for line in mattersend_py:
-    if not in_block:
-        updated_mattersend_py.append(line)
+HEADER = '''# -*- coding:utf-8 -*-
+# Generated by update_emoji_map.py, do not edit.
+#
+# One "name code" pair per line, the code is omitted when it equals the name
+# (custom mattermost emojis). Parsed lazily by mattersend.get_emoji_map().
 
-        if line == 'emoji_to_code = {\n':
-            in_block = True
+emoji_data = """\\
+'''
 
-            for icondata in response:
-                name = icondata[1]['name']
-                code = icondata[1].get('unicode', name)
-                updated_mattersend_py.append("    '{0}': '{1}',\n".format(name, code))
 
-    elif line == '}\n':
-        updated_mattersend_py.append(line)
-        in_block = False
+def load(source):
+    if '://' in source:
+        import requests
+        return requests.get(source).json()
 
-with open('mattersend.py', 'w') as f:
-    f.write(''.join(updated_mattersend_py))
+    with open(source, 'r') as f:
+        return json.load(f)
+
+
+def entries(emojis):
+    for icondata in emojis:
+        if not isinstance(icondata, dict):
+            icondata = icondata[1]
+        name = icondata['name']
+        code = icondata.get('unicode', name)
+        yield name, code
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else EMOJI_URL
+
+    lines = []
+    for name, code in entries(load(source)):
+        lines.append(name if code == name else '{0} {1}'.format(name, code))
+
+    with open(OUTPUT, 'w') as f:
+        f.write(HEADER)
+        f.write('\n'.join(lines))
+        f.write('\n"""\n')
+
+
+if __name__ == '__main__':
+    main()